@@ -1,6 +1,7 @@
 # app/api/v1/endpoints/chat.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from typing import List, Dict, Any, Optional
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 
 from app.core.dependencies import get_chat_service
@@ -9,21 +10,45 @@ from app.domain.entities.message import Message, MessageType, User
 from app.core.exceptions import NotFoundError, ValidationError
 from app.core.logging import get_logger
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 
+def _encode_cursor(message: Message) -> str:
+    """Encode a message's (created_at, id) position as a page cursor."""
+    return f"{message.created_at.isoformat()}|{message.id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a page cursor into its (created_at, id) position."""
+    try:
+        created_at, message_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), message_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/rooms/{room_name}/messages")
 async def get_messages(
     room_name: str = Path(..., description="Room name"),
     limit: int = Query(default=50, ge=1, le=100, description="Number of messages to retrieve"),
     skip: int = Query(default=0, ge=0, description="Number of messages to skip"),
+    paginate: bool = Query(default=False, description="Return a {messages, next_cursor} page of the latest messages"),
+    before: Optional[str] = Query(default=None, description="With paginate, only return messages before this cursor"),
     chat_service: ChatService = Depends(get_chat_service)
-) -> List[Dict[str, Any]]:
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """Get chat messages for a specific room."""
+    cursor = _decode_cursor(before) if paginate and before else None
     try:
-        messages = await chat_service.get_messages_by_room(room_name, limit, skip)
-        return [message.to_dict() for message in messages]
+        if not paginate:
+            messages = await chat_service.get_messages_by_room(room_name, limit, skip)
+            return [message.to_dict() for message in messages]
+        
+        messages = await chat_service.get_messages_before(room_name, limit, cursor)
+        return {
+            "messages": [message.to_dict() for message in messages],
+            "next_cursor": _encode_cursor(messages[0]) if len(messages) == limit else None
+        }
         
     except Exception as e:
         logger.error(f"Error getting messages for room {room_name}: {e}")
@@ -1,6 +1,6 @@
 # app/core/config.py
 import os
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -51,12 +51,21 @@ class Settings(BaseSettings):
         default=os.environ.get("MONGODB_DB_NAME", "chatapp"),
         description="MongoDB database name"
     )
+    # Connection pool sizing; MAX_POOL_SIZE should roughly match concurrent requests per worker
+    MONGODB_MAX_POOL_SIZE: int = Field(default=50, description="Max MongoDB connections per worker")
+    MONGODB_MIN_POOL_SIZE: int = Field(default=10, description="Min idle MongoDB connections kept open")
+    MONGODB_MAX_IDLE_TIME_MS: int = Field(default=300_000, description="Close pooled connections idle longer than this")
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = Field(default=5000, description="Max wait for a pooled connection")
     
     # AI Service API Keys
     LAMAPARSE_API_KEY: str = Field(
         default=os.environ.get("LAMAPARSE_API_KEY", ""),
         description="LlamaParse API key"
     )
+    LAMAPARSE_DISABLE_OCR: bool = Field(
+        default=True,
+        description="Skip OCR in LlamaParse; turn off for scanned, image-only documents"
+    )
     AZURE_OPENAI_KEY: str = Field(
         default=os.environ.get("AZURE_OPENAI_KEY", ""),
         description="Azure OpenAI API key"
@@ -73,6 +82,14 @@ class Settings(BaseSettings):
         default=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-02-01"),
         description="Azure OpenAI API version"
     )
+    AZURE_OPENAI_STRICT_SCHEMA: bool = Field(
+        default=False,
+        description="Request strict json_schema structured outputs; needs API version 2024-08-01-preview or later"
+    )
+    AZURE_OPENAI_EMBEDDING_DEPLOYMENT: str = Field(
+        default=os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", ""),
+        description="Azure OpenAI embedding deployment used by the chat semantic cache; empty disables the cache"
+    )
 
     # Logging settings
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
@@ -80,13 +97,13 @@ class Settings(BaseSettings):
     
     # File upload settings
     MAX_FILE_SIZE: int = Field(default=10 * 1024 * 1024, description="Max file size in bytes")
-    ALLOWED_FILE_TYPES: List[str] = Field(
-        default=[
+    ALLOWED_FILE_TYPES: FrozenSet[str] = Field(
+        default=frozenset([
             "application/pdf",
             "application/msword",
             "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             "text/plain"
-        ],
+        ]),
         description="Allowed file types for upload"
     )
     UPLOAD_DIR: str = Field(default="app/uploaded-files", description="Upload directory")
@@ -94,6 +111,8 @@ class Settings(BaseSettings):
     # Analysis settings
     ANALYSIS_TIMEOUT: int = Field(default=300, description="Analysis timeout in seconds")
     ENABLE_AI_ANALYSIS: bool = Field(default=True, description="Enable AI analysis")
+    MOCK_ANALYSIS_DELAY_MS: int = Field(default=0, description="Simulated delay for mock analysis in milliseconds")
+    MAX_CONCURRENT_ANALYSES: int = Field(default=32, description="Max documents analyzed concurrently in a batch")
     
     # WebSocket settings
     WS_HEARTBEAT_INTERVAL: int = Field(default=30, description="WebSocket heartbeat interval")
@@ -114,8 +133,8 @@ class Settings(BaseSettings):
     @classmethod
     def parse_file_types(cls, v):
         if isinstance(v, str):
-            return [file_type.strip() for file_type in v.split(",")]
-        return v
+            return frozenset(file_type.strip() for file_type in v.split(","))
+        return frozenset(v)
     
     model_config = {
         "env_file": ".env",
@@ -4,10 +4,23 @@ Centralized database management with proper connection handling.
 """
 import asyncio
 from typing import Optional
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.core.config import settings
 
 
+class ObjectIdCodec(TypeDecoder):
+    """Decode ObjectIds straight to strings so results are JSON-ready."""
+    bson_type = ObjectId
+
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+
+codec_options = CodecOptions(type_registry=TypeRegistry([ObjectIdCodec()]))
+
+
 class DatabaseManager:
     """Singleton database manager."""
     _instance: Optional['DatabaseManager'] = None
@@ -25,14 +38,20 @@ class DatabaseManager:
         if self._client is None:
             async with self._lock:
                 if self._client is None:
-                    self._client = AsyncIOMotorClient(settings.MONGODB_URI)
+                    self._client = AsyncIOMotorClient(
+                        settings.MONGODB_URI,
+                        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+                    )
         return self._client
 
     async def get_database(self) -> AsyncIOMotorDatabase:
         """Get database instance."""
         if self._database is None:
             client = await self.get_client()
-            self._database = client[settings.MONGODB_DB_NAME]
+            self._database = client.get_database(settings.MONGODB_DB_NAME, codec_options=codec_options)
         return self._database
 
     async def close_connection(self):
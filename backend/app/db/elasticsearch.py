@@ -0,0 +1,94 @@
+# app/db/elasticsearch.py
+import os
+import logging
+
+try:
+    from elasticsearch import AsyncElasticsearch
+    from elasticsearch.helpers import async_bulk
+except ImportError:  # search falls back to MongoDB when the client isn't installed
+    AsyncElasticsearch = None
+    async_bulk = None
+
+logger = logging.getLogger(__name__)
+
+# Get Elasticsearch configuration from environment variables; empty URL disables it
+ELASTICSEARCH_URL = os.getenv('ELASTICSEARCH_URL', '')
+MESSAGES_INDEX = os.getenv('ELASTICSEARCH_MESSAGES_INDEX', 'messages')
+
+es_client = None
+_index_ready = False
+
+def get_search_client():
+    """Get Elasticsearch client instance, or None if search is not configured"""
+    global es_client
+    if es_client is None and ELASTICSEARCH_URL and AsyncElasticsearch is not None:
+        es_client = AsyncElasticsearch(ELASTICSEARCH_URL)
+    return es_client
+
+async def ensure_messages_index(client):
+    """Create the messages index with a relaxed refresh interval"""
+    global _index_ready
+    if _index_ready:
+        return
+    if not await client.indices.exists(index=MESSAGES_INDEX):
+        await client.indices.create(
+            index=MESSAGES_INDEX,
+            settings={"refresh_interval": "30s"},
+            mappings={
+                "properties": {
+                    "room_name": {"type": "keyword"},
+                    "content": {"type": "text"},
+                    "created_at": {"type": "date"}
+                }
+            }
+        )
+    _index_ready = True
+
+async def index_messages(messages):
+    """Bulk index messages, routed by room so each room lives on one shard"""
+    client = get_search_client()
+    if client is None or not messages:
+        return
+    try:
+        await ensure_messages_index(client)
+        await async_bulk(client, (
+            {
+                "_index": MESSAGES_INDEX,
+                "_id": message.id,
+                "_routing": message.room_name,
+                "_source": message.to_dict()
+            }
+            for message in messages
+        ))
+    except Exception as e:
+        logger.error(f"Error indexing messages in Elasticsearch: {e}")
+
+async def delete_message(message):
+    """Remove a deleted message from the index; a message that was never indexed is not an error"""
+    client = get_search_client()
+    if client is None:
+        return
+    try:
+        await client.options(ignore_status=404).delete(
+            index=MESSAGES_INDEX,
+            id=message.id,
+            routing=message.room_name
+        )
+    except Exception as e:
+        logger.error(f"Error deleting message {message.id} from Elasticsearch: {e}")
+
+async def search_messages(room_name, search_term, limit=50):
+    """Fuzzy full-text search within a room; returns message dicts"""
+    client = get_search_client()
+    response = await client.search(
+        index=MESSAGES_INDEX,
+        routing=room_name,
+        query={
+            "bool": {
+                "filter": [{"term": {"room_name": room_name}}],
+                "must": [{"match": {"content": {"query": search_term, "fuzziness": "AUTO"}}}]
+            }
+        },
+        size=limit
+    )
+    return [hit["_source"] for hit in response["hits"]["hits"]]
@@ -1,5 +1,6 @@
 # app/db/redis.py
 import redis
+import redis.asyncio
 import os
 import json
 import logging
@@ -37,6 +38,25 @@ def get_redis_client():
     """Get Redis client instance"""
     return redis_client
 
+# Async client for use from request handlers, created on first use
+async_redis_client = None
+
+def get_async_redis_client():
+    """Get asyncio Redis client instance"""
+    global async_redis_client
+    if async_redis_client is None:
+        async_redis_client = redis.asyncio.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD,
+            decode_responses=True,
+            socket_timeout=5,
+            socket_connect_timeout=5,
+            retry_on_timeout=True
+        )
+    return async_redis_client
+
 # Session management functions
 def set_session(session_id, user_data, expire_seconds=3600):
     """Store session data in Redis with expiration"""
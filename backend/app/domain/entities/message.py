@@ -16,6 +16,10 @@ class MessageType(Enum):
     AI_RESPONSE = "ai_response"
 
 
+# Value -> member lookup that avoids Enum.__call__ and its ValueError path
+MESSAGE_TYPES = {message_type.value: message_type for message_type in MessageType}
+
+
 @dataclass
 class User:
     """User information in message context."""
@@ -11,14 +11,16 @@ import json
 from typing import Dict, Any
 
 from app.core.config import settings
-from app.core.database import close_database_connection, check_database_health
-from app.core.dependencies import get_chat_service, get_websocket_service
+from app.core.database import close_database_connection, check_database_health, get_database
+from app.core.dependencies import get_websocket_service
 from app.core.exceptions import BaseAPIException, create_http_exception
 from app.core.logging import get_logger
 from app.api.v1 import api_router
 from app.services.chat_service import ChatService
+from app.services.document_config_service import DocumentConfigService
+from app.repositories.chat_repository import ChatRepository
 from app.services.websocket_service import WebSocketService
-from app.domain.entities.message import Message, User, MessageType
+from app.domain.entities.message import Message, User, MessageType, MESSAGE_TYPES
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -39,6 +41,9 @@ async def lifespan(app: FastAPI):
             logger.warning("Database health check failed on startup")
         else:
             logger.info("Database connection established successfully")
+            database = await get_database()
+            await ChatRepository(database).ensure_indexes()
+            await DocumentConfigService(database).ensure_indexes()
     except Exception as e:
         logger.error(f"Failed to establish database connection: {e}")
     
@@ -124,7 +129,7 @@ async def websocket_endpoint(
     """WebSocket endpoint for real-time chat."""
     # Create services manually since WebSocket endpoints don't support Depends()
     websocket_service = WebSocketService()
-    chat_service = await get_chat_service()
+    chat_service = ChatService(ChatRepository(await get_database()), websocket_service)
     
     try:
         # Connect to WebSocket
@@ -136,7 +141,7 @@ async def websocket_endpoint(
         
         # Send previous messages
         try:
-            previous_messages = await chat_service.get_messages_by_room(room_name, limit=50)
+            previous_messages = await chat_service.get_messages_before(room_name, limit=50)
             await websocket_service.send_personal_message(
                 {
                     "type": "previous_messages",
@@ -164,21 +169,13 @@ async def websocket_endpoint(
                 )
                 
                 # Send message
-                message = await chat_service.send_message(
+                await chat_service.send_message(
                     content=message_data["content"],
                     room_name=room_name,
                     user=user,
-                    message_type=MessageType(message_data.get("type", "text")),
-                    metadata=message_data.get("metadata", {})
-                )
-                
-                # Broadcast to other clients
-                await websocket_service.broadcast_message(
-                    room_name,
-                    {
-                        "type": "message",
-                        "data": message.to_dict()
-                    },
+                    message_type=MESSAGE_TYPES.get(message_data.get("type"), MessageType.TEXT),
+                    metadata=message_data.get("metadata", {}),
+                    # send_message broadcasts to the other clients in the room
                     exclude_client=client_id
                 )
                 
@@ -3,18 +3,32 @@ Base repository class.
 Provides common repository functionality and abstract interface.
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, TypeVar, Generic
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, Generic
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
 
 from app.core.exceptions import DatabaseError, NotFoundError
 from app.core.logging import get_logger
 
+try:
+    from ciso8601 import parse_datetime as _iso
+except ImportError:  # optional speedup, fall back to the stdlib parser
+    _iso = None
+
 T = TypeVar('T')
 logger = get_logger(__name__)
 
 
+def _parse_dt(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp string into a datetime."""
+    if _iso is not None:
+        return _iso(value)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
 class BaseRepository(ABC, Generic[T]):
     """Base repository class with common database operations."""
     
@@ -36,6 +50,29 @@ class BaseRepository(ABC, Generic[T]):
             logger.error(f"Error creating {self.collection_name}: {e}")
             raise DatabaseError(f"Failed to create {self.collection_name}", {"error": str(e)})
     
+    async def bulk_create(self, entities: List[T]) -> int:
+        """Create multiple entities in one round trip, keeping their own timestamps."""
+        try:
+            now = datetime.now()
+            documents = []
+            for entity in entities:
+                entity_dict = self._entity_to_dict(entity)
+                entity_dict['created_at'] = getattr(entity, 'created_at', None) or now
+                entity_dict['updated_at'] = getattr(entity, 'updated_at', None) or now
+                documents.append(entity_dict)
+            
+            result = await self.collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            logger.error(f"Error bulk creating {self.collection_name}: {e}")
+            raise DatabaseError(
+                f"Failed to create {self.collection_name}",
+                {"count": len(entities), "error": str(e), "write_errors": e.details.get("writeErrors", [])}
+            )
+        except Exception as e:
+            logger.error(f"Error bulk creating {self.collection_name}: {e}")
+            raise DatabaseError(f"Failed to create {self.collection_name}", {"count": len(entities), "error": str(e)})
+    
     async def get_by_id(self, entity_id: str) -> Optional[T]:
         """Get entity by ID."""
         try:
@@ -120,6 +157,39 @@ class BaseRepository(ABC, Generic[T]):
             logger.error(f"Error updating {self.collection_name} {entity_id}: {e}")
             raise DatabaseError(f"Failed to update {self.collection_name}", {"id": entity_id, "error": str(e)})
     
+    async def bulk_update(self, updates: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Apply (entity_id, patch) updates by string ID with a single bulk_write."""
+        if not updates:
+            return 0
+        try:
+            now = datetime.now()
+            result = await self.collection.bulk_write(
+                [UpdateOne({"id": entity_id}, {"$set": {**patch, "updated_at": now}}) for entity_id, patch in updates],
+                ordered=False
+            )
+            return result.modified_count
+        except BulkWriteError as e:
+            logger.error(f"Error bulk updating {self.collection_name}: {e}")
+            raise DatabaseError(
+                f"Failed to update {self.collection_name}",
+                {"count": len(updates), "error": str(e), "write_errors": e.details.get("writeErrors", [])}
+            )
+        except Exception as e:
+            logger.error(f"Error bulk updating {self.collection_name}: {e}")
+            raise DatabaseError(f"Failed to update {self.collection_name}", {"count": len(updates), "error": str(e)})
+    
+    async def _quick_update(self, entity_id: str, patch: Dict[str, Any]) -> bool:
+        """Apply a small field patch by string ID in a single round trip."""
+        try:
+            result = await self.collection.update_one(
+                {"id": entity_id},
+                {"$set": {**patch, "updated_at": datetime.now()}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating {self.collection_name} {entity_id}: {e}")
+            raise DatabaseError(f"Failed to update {self.collection_name}", {"id": entity_id, "error": str(e)})
+    
     async def delete(self, entity_id: str) -> bool:
         """Delete entity by ID."""
         try:
@@ -146,6 +216,26 @@ class BaseRepository(ABC, Generic[T]):
             logger.error(f"Error deleting {self.collection_name} {entity_id}: {e}")
             raise DatabaseError(f"Failed to delete {self.collection_name}", {"id": entity_id, "error": str(e)})
     
+    async def find_and_delete(self, entity_id: str) -> T:
+        """Delete entity by ID and return it in a single round trip."""
+        try:
+            document = await self.collection.find_one_and_delete({"id": entity_id})
+            
+            # Fallback to ObjectId if it's a valid ObjectId
+            if document is None and ObjectId.is_valid(entity_id):
+                document = await self.collection.find_one_and_delete({"_id": ObjectId(entity_id)})
+            
+            if document is None:
+                raise NotFoundError(self.collection_name, entity_id)
+            
+            return self._dict_to_entity(document)
+                
+        except NotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"Error deleting {self.collection_name} {entity_id}: {e}")
+            raise DatabaseError(f"Failed to delete {self.collection_name}", {"id": entity_id, "error": str(e)})
+    
     async def count(self, filter_dict: Optional[Dict[str, Any]] = None) -> int:
         """Count entities with optional filtering."""
         try:
@@ -176,6 +266,7 @@ class BaseRepository(ABC, Generic[T]):
     
     def _convert_object_id(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert ObjectId to string in dictionary."""
-        if '_id' in data:
+        # Databases from app.core.database already decode ObjectIds to strings
+        if isinstance(data.get('_id'), ObjectId):
             data['_id'] = str(data['_id'])
         return data
\ No newline at end of file
@@ -2,12 +2,13 @@
 Chat repository implementation.
 Handles chat-related database operations.
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
 from datetime import datetime
 
-from app.repositories.base_repository import BaseRepository
-from app.domain.entities.message import Message, MessageType, User
+from app.repositories.base_repository import BaseRepository, _parse_dt
+from app.domain.entities.message import Message, MessageType, MESSAGE_TYPES, User
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -19,6 +20,19 @@ class ChatRepository(BaseRepository[Message]):
     def __init__(self, database: AsyncIOMotorDatabase):
         super().__init__(database, "messages")
     
+    async def ensure_indexes(self) -> None:
+        """Create indexes backing the message query shapes."""
+        try:
+            await self.collection.create_indexes([
+                IndexModel([("room_name", 1), ("created_at", -1), ("id", -1)]),
+                IndexModel([("user.id", 1), ("created_at", -1)]),
+                IndexModel([("room_name", 1), ("content", "text")]),
+                IndexModel([("id", 1)])
+            ])
+        except Exception as e:
+            logger.error(f"Error creating message indexes: {e}")
+            raise
+    
     def _entity_to_dict(self, entity: Message) -> Dict[str, Any]:
         """Convert Message entity to dictionary."""
         return {
@@ -43,9 +57,9 @@ class ChatRepository(BaseRepository[Message]):
         
         # Convert datetime strings back to datetime objects
         if isinstance(data.get('created_at'), str):
-            data['created_at'] = datetime.fromisoformat(data['created_at'].replace('Z', '+00:00'))
+            data['created_at'] = _parse_dt(data['created_at'])
         if isinstance(data.get('updated_at'), str):
-            data['updated_at'] = datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00'))
+            data['updated_at'] = _parse_dt(data['updated_at'])
         
         return Message(
             id=data['id'],
@@ -56,7 +70,7 @@ class ChatRepository(BaseRepository[Message]):
                 name=data['user']['name'],
                 avatar=data['user'].get('avatar')
             ),
-            message_type=MessageType(data.get('message_type', 'text')),
+            message_type=MESSAGE_TYPES.get(data.get('message_type'), MessageType.TEXT),
             created_at=data.get('created_at', datetime.now()),
             updated_at=data.get('updated_at', datetime.now()),
             metadata=data.get('metadata', {}),
@@ -81,6 +95,33 @@ class ChatRepository(BaseRepository[Message]):
             logger.error(f"Error getting messages for room {room_name}: {e}")
             raise
     
+    async def get_messages_before(
+        self, 
+        room_name: str, 
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None
+    ) -> List[Message]:
+        """Get the latest messages in a room before a (created_at, id) cursor, oldest first."""
+        try:
+            query: Dict[str, Any] = {"room_name": room_name}
+            if before:
+                # The id tie-breaker keeps messages sharing a timestamp from being skipped
+                created_at, message_id = before
+                query["$or"] = [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "id": {"$lt": message_id}}
+                ]
+            
+            # Keyset pagination: walk the newest messages first, then restore chronological order
+            cursor = self.collection.find(query).sort([("created_at", -1), ("id", -1)]).limit(limit)
+            
+            documents = await cursor.to_list(length=limit)
+            documents.reverse()
+            return [self._dict_to_entity(doc) for doc in documents]
+        except Exception as e:
+            logger.error(f"Error getting messages for room {room_name}: {e}")
+            raise
+    
     async def get_messages_by_user(
         self, 
         user_id: str, 
@@ -134,8 +175,7 @@ class ChatRepository(BaseRepository[Message]):
                 "created_at": {"$gte": since}
             }
             
-            cursor = self.collection.find(query)
-            cursor = cursor.sort("created_at", 1).limit(limit)
+            cursor = self.collection.find(query).sort("created_at", 1).limit(limit)
             
             documents = await cursor.to_list(length=limit)
             return [self._dict_to_entity(doc) for doc in documents]
@@ -158,4 +198,33 @@ class ChatRepository(BaseRepository[Message]):
             return await self.collection.count_documents({"room_name": room_name})
         except Exception as e:
             logger.error(f"Error counting messages for room {room_name}: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def aggregate_types_since(self, room_name: str, since: datetime) -> Dict[str, int]:
+        """Count messages per type in a room since a specific time."""
+        try:
+            pipeline = [
+                {"$match": {"room_name": room_name, "created_at": {"$gte": since}}},
+                {"$group": {"_id": "$message_type", "n": {"$sum": 1}}}
+            ]
+            cursor = self.collection.aggregate(pipeline)
+            return {doc["_id"]: doc["n"] async for doc in cursor}
+        except Exception as e:
+            logger.error(f"Error aggregating message types for room {room_name}: {e}")
+            raise
+    
+    async def get_last_message_time(self, room_name: str) -> Optional[datetime]:
+        """Get the creation time of the latest message in a room."""
+        try:
+            document = await self.collection.find_one(
+                {"room_name": room_name},
+                projection={"created_at": 1, "_id": 0},
+                sort=[("created_at", -1)]
+            )
+            if not document:
+                return None
+            created_at = document.get("created_at")
+            return _parse_dt(created_at) if isinstance(created_at, str) else created_at
+        except Exception as e:
+            logger.error(f"Error getting last message time for room {room_name}: {e}")
+            raise
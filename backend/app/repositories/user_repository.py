@@ -6,7 +6,7 @@ from typing import List, Optional, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime
 
-from app.repositories.base_repository import BaseRepository
+from app.repositories.base_repository import BaseRepository, _parse_dt
 from app.domain.entities.user import User, UserRole, UserStatus
 from app.core.logging import get_logger
 
@@ -38,11 +38,11 @@ class UserRepository(BaseRepository[User]):
         
         # Convert datetime strings back to datetime objects
         if isinstance(data.get('created_at'), str):
-            data['created_at'] = datetime.fromisoformat(data['created_at'].replace('Z', '+00:00'))
+            data['created_at'] = _parse_dt(data['created_at'])
         if isinstance(data.get('updated_at'), str):
-            data['updated_at'] = datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00'))
+            data['updated_at'] = _parse_dt(data['updated_at'])
         if isinstance(data.get('last_login'), str):
-            data['last_login'] = datetime.fromisoformat(data['last_login'].replace('Z', '+00:00'))
+            data['last_login'] = _parse_dt(data['last_login'])
         
         return User(
             id=data['id'],
@@ -101,7 +101,7 @@ class UserRepository(BaseRepository[User]):
     async def update_last_login(self, user_id: str) -> bool:
         """Update user's last login timestamp."""
         try:
-            return await self.update(user_id, {"last_login": datetime.now()})
+            return await self._quick_update(user_id, {"last_login": datetime.now()})
         except Exception as e:
             logger.error(f"Error updating last login for user {user_id}: {e}")
             raise
@@ -113,7 +113,7 @@ class UserRepository(BaseRepository[User]):
     ) -> bool:
         """Update user status."""
         try:
-            return await self.update(user_id, {"status": status.value})
+            return await self._quick_update(user_id, {"status": status.value})
         except Exception as e:
             logger.error(f"Error updating user status {user_id}: {e}")
             raise
@@ -125,7 +125,7 @@ class UserRepository(BaseRepository[User]):
     ) -> bool:
         """Update user role."""
         try:
-            return await self.update(user_id, {"role": role.value})
+            return await self._quick_update(user_id, {"role": role.value})
         except Exception as e:
             logger.error(f"Error updating user role {user_id}: {e}")
             raise
@@ -137,7 +137,7 @@ class UserRepository(BaseRepository[User]):
     ) -> bool:
         """Update user preferences."""
         try:
-            return await self.update(user_id, {"preferences": preferences})
+            return await self._quick_update(user_id, {"preferences": preferences})
         except Exception as e:
             logger.error(f"Error updating user preferences {user_id}: {e}")
             raise
@@ -6,6 +6,11 @@ from app.services.base_service import BaseService
 from app.core.exceptions import AnalysisError, ValidationError
 from app.core.config import settings
 import asyncio
+import time
+from datetime import datetime, timezone
+
+# Last formatted timestamp, reused within the same second
+_TS_CACHE = {"t": float("-inf"), "s": ""}
 
 
 class AnalysisService(BaseService):
@@ -60,27 +65,28 @@ class AnalysisService(BaseService):
             
             self.logger.info(f"Starting batch analysis of {len(documents)} documents")
             
-            # Create analysis tasks
-            tasks = []
-            for document in documents:
-                task = self.analyze_document(document)
-                tasks.append(task)
+            # Cap concurrent analyses so large batches don't hit rate limits
+            semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_ANALYSES)
+            
+            async def _bounded(document: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.analyze_document(document)
             
-            # Execute all analyses concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Execute analyses concurrently
+            results = await asyncio.gather(*(_bounded(d) for d in documents), return_exceptions=True)
             
             # Process results
-            analysis_results = []
+            analysis_results = [None] * len(documents)
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
                     self.logger.error(f"Analysis failed for document {i}: {result}")
-                    analysis_results.append({
+                    analysis_results[i] = {
                         "document_id": documents[i].get("document_id"),
                         "error": str(result),
                         "success": False
-                    })
+                    }
                 else:
-                    analysis_results.append(result)
+                    analysis_results[i] = result
             
             successful_analyses = len([r for r in analysis_results if r.get("success", True)])
             self.logger.info(f"Batch analysis completed: {successful_analyses}/{len(documents)} successful")
@@ -102,11 +108,12 @@ class AnalysisService(BaseService):
         required_fields = ["document_id", "content_type"]
         self.validate_required_fields(document, required_fields)
         
-        if not isinstance(document.get("content_type"), str):
+        content_type = document.get("content_type")
+        if not isinstance(content_type, str):
             raise ValidationError("Content type must be a string")
         
-        if document.get("content_type") not in settings.ALLOWED_FILE_TYPES:
-            raise ValidationError(f"Content type '{document.get('content_type')}' not supported for analysis")
+        if content_type not in settings.ALLOWED_FILE_TYPES:
+            raise ValidationError(f"Content type '{content_type}' not supported for analysis")
     
     def _validate_analysis_result(self, result: Dict[str, Any]) -> None:
         """Validate analysis result"""
@@ -124,6 +131,10 @@ class AnalysisService(BaseService):
             raise ValidationError("Analysis score must be between 0 and 100")
     
     def _get_current_timestamp(self) -> str:
-        """Get current timestamp in ISO format"""
-        from datetime import datetime
-        return datetime.utcnow().isoformat()
+        """Get current timestamp in ISO format, at one-second resolution"""
+        # Staleness uses the monotonic clock so a wall-clock step back cannot pin the cached value
+        now = time.monotonic()
+        if now - _TS_CACHE["t"] >= 1.0:
+            _TS_CACHE["t"] = now
+            _TS_CACHE["s"] = datetime.now(timezone.utc).isoformat()
+        return _TS_CACHE["s"]
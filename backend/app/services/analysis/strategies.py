@@ -1,11 +1,54 @@
 """
 Analysis strategies for different document types
 """
+import asyncio
 from abc import ABC, abstractmethod
+from collections import Counter
 from typing import Dict, List, Any, Optional
+from app.core.config import settings
 from app.core.logging import LoggerMixin
 
 
+# Fixed issue set returned by the mock strategy
+_MOCK_ISSUES = (
+    {
+        "type": "critical",
+        "message": "Missing Document ID (SOP-###)",
+        "severity": 3,
+        "line": 1,
+        "section": "header"
+    },
+    {
+        "type": "major",
+        "message": "Incomplete revision history table",
+        "severity": 2,
+        "line": 5,
+        "section": "revision_history"
+    },
+    {
+        "type": "minor",
+        "message": "Missing approval signature line",
+        "severity": 1,
+        "line": 20,
+        "section": "approval"
+    },
+    {
+        "type": "critical",
+        "message": "Contains placeholder text 'TBD'",
+        "severity": 3,
+        "line": 15,
+        "section": "content"
+    },
+    {
+        "type": "major",
+        "message": "Stale reference: 'ICH Q7' missing year",
+        "severity": 2,
+        "line": 12,
+        "section": "references"
+    }
+)
+
+
 class AnalysisStrategy(ABC, LoggerMixin):
     """Abstract base class for analysis strategies"""
     
@@ -27,51 +70,16 @@ class MockAnalysisStrategy(AnalysisStrategy):
         """Perform mock analysis"""
         self.logger.info(f"Performing mock analysis on document {document.get('document_id')}")
         
-        # Simulate analysis delay
-        import asyncio
-        await asyncio.sleep(0.1)
+        # Optional simulated analysis delay
+        if settings.MOCK_ANALYSIS_DELAY_MS:
+            await asyncio.sleep(settings.MOCK_ANALYSIS_DELAY_MS / 1000)
         
-        # Generate mock issues
-        mock_issues = [
-            {
-                "type": "critical",
-                "message": "Missing Document ID (SOP-###)",
-                "severity": 3,
-                "line": 1,
-                "section": "header"
-            },
-            {
-                "type": "major",
-                "message": "Incomplete revision history table",
-                "severity": 2,
-                "line": 5,
-                "section": "revision_history"
-            },
-            {
-                "type": "minor",
-                "message": "Missing approval signature line",
-                "severity": 1,
-                "line": 20,
-                "section": "approval"
-            },
-            {
-                "type": "critical",
-                "message": "Contains placeholder text 'TBD'",
-                "severity": 3,
-                "line": 15,
-                "section": "content"
-            },
-            {
-                "type": "major",
-                "message": "Stale reference: 'ICH Q7' missing year",
-                "severity": 2,
-                "line": 12,
-                "section": "references"
-            }
-        ]
+        # Fresh dicts per call so callers can modify the returned issues
+        mock_issues = [dict(issue) for issue in _MOCK_ISSUES]
         
-        # Calculate compliance score
-        total_severity = sum(issue["severity"] for issue in mock_issues)
+        # Calculate compliance score from a single pass over the issues
+        severity_counts = Counter(issue["severity"] for issue in mock_issues)
+        total_severity = sum(severity * count for severity, count in severity_counts.items())
         score = max(0, 100 - (total_severity * 10))
         
         return {
@@ -80,9 +88,9 @@ class MockAnalysisStrategy(AnalysisStrategy):
             "strategy_used": self.get_strategy_name(),
             "analysis_metadata": {
                 "total_issues": len(mock_issues),
-                "critical_issues": len([i for i in mock_issues if i["severity"] == 3]),
-                "major_issues": len([i for i in mock_issues if i["severity"] == 2]),
-                "minor_issues": len([i for i in mock_issues if i["severity"] == 1])
+                "critical_issues": severity_counts[3],
+                "major_issues": severity_counts[2],
+                "minor_issues": severity_counts[1]
             }
         }
     
@@ -156,14 +164,15 @@ class TextAnalysisStrategy(AnalysisStrategy):
 class AnalysisStrategyFactory:
     """Factory for creating analysis strategies"""
     
-    def __init__(self):
-        self._strategies = {
-            "application/pdf": PDFAnalysisStrategy(),
-            "application/msword": WordAnalysisStrategy(),
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document": WordAnalysisStrategy(),
-            "text/plain": TextAnalysisStrategy(),
-        }
-        self._default_strategy = MockAnalysisStrategy()
+    # Strategies are stateless, so one shared instance of each is enough
+    _word_strategy = WordAnalysisStrategy()
+    _strategies = {
+        "application/pdf": PDFAnalysisStrategy(),
+        "application/msword": _word_strategy,
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": _word_strategy,
+        "text/plain": TextAnalysisStrategy(),
+    }
+    _default_strategy = MockAnalysisStrategy()
     
     def get_strategy(self, content_type: str) -> AnalysisStrategy:
         """Get analysis strategy for content type"""
@@ -2,6 +2,13 @@
 Base service class.
 Provides common service functionality and abstract interface.
 """
+import inspect
+import logging
+import os
+import re
+import threading
+from functools import wraps
+from uuid import UUID
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, TypeVar, Generic
 from datetime import datetime
@@ -12,12 +19,65 @@ from app.core.exceptions import BaseAPIException
 T = TypeVar('T')
 logger = get_logger(__name__)
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Removes potentially dangerous characters in a single pass
+_SANITIZE_TABLE = str.maketrans('', '', '<>"\'&\x00\r\n')
+_UNSAFE_RE = re.compile('[<>"\'&\x00\r\n]')
+
+
+# Random bytes for IDs are read from urandom in bulk and handed out 16 at a time
+_ID_POOL_SIZE = 1 << 16
+_id_pool = memoryview(b"")
+_id_pool_pos = 0
+_id_pool_lock = threading.Lock()
+
+
+def _reset_id_pool() -> None:
+    """Drop pooled bytes so a forked worker never reuses its parent's IDs."""
+    global _id_pool, _id_pool_pos
+    _id_pool, _id_pool_pos = memoryview(b""), 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+
+def fast_uuid() -> str:
+    """Generate a random (version 4) UUID hex string from the pooled bytes."""
+    global _id_pool, _id_pool_pos
+    with _id_pool_lock:
+        if _id_pool_pos + 16 > len(_id_pool):
+            _id_pool, _id_pool_pos = memoryview(os.urandom(_ID_POOL_SIZE)), 0
+        raw = _id_pool[_id_pool_pos:_id_pool_pos + 16].tobytes()
+        _id_pool_pos += 16
+    return UUID(bytes=raw, version=4).hex
+
+
+def log_errors(operation: str, *detail_args: str):
+    """Log and re-raise exceptions from a service coroutine, with the named arguments as details."""
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                return await func(self, *args, **kwargs)
+            except Exception as e:
+                bound = signature.bind_partial(self, *args, **kwargs).arguments
+                self.log_error(operation, e, {name: bound.get(name) for name in detail_args})
+                raise
+        
+        return wrapper
+    return decorator
+
 
 class BaseService(ABC, Generic[T]):
     """Base service class with common business logic operations."""
     
-    def __init__(self):
-        self.logger = get_logger(self.__class__.__name__)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.logger = get_logger(cls.__name__)
     
     def validate_required_fields(self, data: Dict[str, Any], required_fields: List[str]) -> None:
         """Validate that required fields are present in data."""
@@ -40,9 +100,7 @@ class BaseService(ABC, Generic[T]):
     
     def validate_email_format(self, email: str) -> None:
         """Validate email format."""
-        import re
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, email):
+        if not _EMAIL_RE.match(email):
             raise BaseAPIException(
                 message="Invalid email format",
                 status_code=400,
@@ -54,17 +112,15 @@ class BaseService(ABC, Generic[T]):
         if not isinstance(value, str):
             return str(value)
         
-        # Remove potentially dangerous characters
-        dangerous_chars = ['<', '>', '"', "'", '&', '\x00', '\r', '\n']
-        for char in dangerous_chars:
-            value = value.replace(char, '')
+        # Plain ASCII chat text usually has nothing to remove; skip building a copy
+        if value.isascii() and _UNSAFE_RE.search(value) is None:
+            return value.strip()
         
-        return value.strip()
+        return value.translate(_SANITIZE_TABLE).strip()
     
     def generate_id(self) -> str:
         """Generate a unique ID."""
-        import uuid
-        return str(uuid.uuid4())
+        return fast_uuid()
     
     def get_current_timestamp(self) -> datetime:
         """Get current timestamp."""
@@ -76,14 +132,20 @@ class BaseService(ABC, Generic[T]):
     
     def log_operation(self, operation: str, details: Dict[str, Any] = None):
         """Log operation details."""
-        self.logger.info(f"Operation: {operation}", extra=details or {})
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self.logger.info("Operation: %s", operation, extra=details or {})
     
     def log_error(self, operation: str, error: Exception, details: Dict[str, Any] = None):
         """Log error details."""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         self.logger.error(
-            f"Error in {operation}: {str(error)}",
+            "Error in %s: %s",
+            operation,
+            error,
             extra=details or {},
-            exc_info=True
+            exc_info=error
         )
     
     @abstractmethod
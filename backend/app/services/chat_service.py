@@ -2,17 +2,43 @@
 Chat service implementation.
 Handles chat-related business logic.
 """
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+import asyncio
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, date, time
 
-from app.services.base_service import BaseService
+import orjson
+
+from app.services.base_service import BaseService, log_errors
 from app.repositories.chat_repository import ChatRepository
-from app.domain.entities.message import Message, MessageType, User
+from app.services.message_batcher import get_message_batcher
+from app.domain.entities.message import Message, MessageType, MESSAGE_TYPES, User
 from app.core.exceptions import ValidationError, NotFoundError
 from app.core.logging import get_logger
+from app.db.redis import get_async_redis_client
+from app.db import elasticsearch as message_search
 
 logger = get_logger(__name__)
 
+ROOM_CACHE_TTL = 60
+
+# Deletes a room's tracked page keys and the tracking set in one round trip
+_INVALIDATE_ROOM_SCRIPT = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+table.insert(keys, KEYS[1])
+return redis.call('DEL', unpack(keys))
+"""
+
+# (date, midnight) for the current day, recomputed when the date rolls over
+_midnight_cache = [None, None]
+
+
+def _today_midnight() -> datetime:
+    """Get the start of the current day."""
+    today = date.today()
+    if _midnight_cache[0] != today:
+        _midnight_cache[:] = [today, datetime.combine(today, time.min)]
+    return _midnight_cache[1]
+
 
 class ChatService(BaseService[Message]):
     """Service for chat operations."""
@@ -21,110 +47,106 @@ class ChatService(BaseService[Message]):
         super().__init__()
         self.chat_repository = chat_repository
         self.websocket_service = websocket_service
+        self.cache = get_async_redis_client()
+        self.message_batcher = get_message_batcher(chat_repository)
     
+    @log_errors("create_message", "data")
     async def create(self, data: Dict[str, Any]) -> Message:
         """Create a new message."""
-        try:
-            # Validate required fields
-            self.validate_required_fields(data, ['content', 'room_name', 'user'])
-            
-            # Validate content length
-            self.validate_field_length(data['content'], 'content', 1000)
-            
-            # Sanitize content
-            content = self.sanitize_string(data['content'])
-            
-            # Create user object
-            user_data = data['user']
-            user = User(
-                id=user_data.get('id', self.generate_id()),
-                name=self.sanitize_string(user_data['name']),
-                avatar=user_data.get('avatar')
-            )
-            
-            # Create message
-            message = Message(
-                id=self.generate_id(),
-                content=content,
-                room_name=data['room_name'],
-                user=user,
-                message_type=MessageType(data.get('message_type', 'text')),
-                metadata=data.get('metadata', {}),
-                reply_to=data.get('reply_to')
-            )
-            
-            # Save to repository
-            await self.chat_repository.create(message)
-            
-            self.log_operation("create_message", {
-                "message_id": message.id,
-                "room_name": message.room_name,
-                "user_id": user.id
-            })
-            
-            return message
-            
-        except Exception as e:
-            self.log_error("create_message", e, {"data": data})
-            raise
+        # Validate required fields
+        self.validate_required_fields(data, ['content', 'room_name', 'user'])
+        
+        # Validate content length
+        self.validate_field_length(data['content'], 'content', 1000)
+        
+        # Sanitize content
+        content = self.sanitize_string(data['content'])
+        
+        # Create user object
+        user_data = data['user']
+        user = User(
+            id=user_data.get('id', self.generate_id()),
+            name=self.sanitize_string(user_data['name']),
+            avatar=user_data.get('avatar')
+        )
+        
+        # Create message
+        message = Message(
+            id=self.generate_id(),
+            content=content,
+            room_name=data['room_name'],
+            user=user,
+            message_type=MESSAGE_TYPES.get(data.get('message_type'), MessageType.TEXT),
+            metadata=data.get('metadata', {}),
+            reply_to=data.get('reply_to')
+        )
+        
+        return await self._persist(message)
     
+    async def _persist(self, message: Message) -> Message:
+        """Save an already-built message."""
+        # Concurrent creates are coalesced into one insert
+        await self.message_batcher.add(message)
+        await self._invalidate_room_cache(message.room_name)
+        
+        self.logger.info(
+            "Operation: create_message id=%s room=%s user=%s",
+            message.id, message.room_name, message.user.id
+        )
+        
+        return message
+    
+    @log_errors("get_message_by_id", "message_id")
     async def get_by_id(self, message_id: str) -> Optional[Message]:
         """Get message by ID."""
-        try:
-            return await self.chat_repository.get_by_id(message_id)
-        except Exception as e:
-            self.log_error("get_message_by_id", e, {"message_id": message_id})
-            raise
+        return await self.chat_repository.get_by_id(message_id)
     
+    @log_errors("update_message", "message_id", "data")
     async def update(self, message_id: str, data: Dict[str, Any]) -> Message:
         """Update message."""
-        try:
-            message = await self.get_by_id(message_id)
-            if not message:
-                raise NotFoundError("Message", message_id)
-            
-            # Update content if provided
-            if 'content' in data:
-                self.validate_field_length(data['content'], 'content', 1000)
-                message.edit_content(self.sanitize_string(data['content']))
-            
-            # Update metadata if provided
-            if 'metadata' in data:
-                for key, value in data['metadata'].items():
-                    message.add_metadata(key, value)
-            
-            # Save updated message
-            await self.chat_repository.update(message_id, {
-                "content": message.content,
-                "is_edited": message.is_edited,
-                "updated_at": message.updated_at,
-                "metadata": message.metadata
-            })
-            
-            self.log_operation("update_message", {
-                "message_id": message_id,
-                "is_edited": message.is_edited
-            })
-            
-            return message
-            
-        except Exception as e:
-            self.log_error("update_message", e, {"message_id": message_id, "data": data})
-            raise
+        message = await self.get_by_id(message_id)
+        if not message:
+            raise NotFoundError("Message", message_id)
+        
+        # Update content if provided
+        if 'content' in data:
+            self.validate_field_length(data['content'], 'content', 1000)
+            message.edit_content(self.sanitize_string(data['content']))
+        
+        # Update metadata if provided
+        if 'metadata' in data:
+            for key, value in data['metadata'].items():
+                message.add_metadata(key, value)
+        
+        # Save updated message; concurrent edits are coalesced into one bulk_write
+        await self.message_batcher.update(message, {
+            "content": message.content,
+            "is_edited": message.is_edited,
+            "updated_at": message.updated_at,
+            "metadata": message.metadata
+        })
+        await self._invalidate_room_cache(message.room_name)
+        
+        self.logger.info(
+            "Operation: update_message id=%s edited=%s",
+            message_id, message.is_edited
+        )
+        
+        return message
     
+    @log_errors("delete_message", "message_id")
     async def delete(self, message_id: str) -> bool:
         """Delete message."""
-        try:
-            result = await self.chat_repository.delete(message_id)
-            
-            self.log_operation("delete_message", {"message_id": message_id})
-            
-            return result
-            
-        except Exception as e:
-            self.log_error("delete_message", e, {"message_id": message_id})
-            raise
+        # One find-and-delete returns the room needed for cache invalidation
+        message = await self.chat_repository.find_and_delete(message_id)
+        await self._invalidate_room_cache(message.room_name)
+        await message_search.delete_message(message)
+        
+        self.logger.info("Operation: delete_message id=%s", message_id)
+        
+        return True
     
+    @log_errors("get_messages_by_room", "room_name", "limit")
     async def get_messages_by_room(
         self, 
         room_name: str, 
@@ -132,26 +154,46 @@ class ChatService(BaseService[Message]):
         skip: int = 0
     ) -> List[Message]:
         """Get messages for a specific room."""
-        try:
+        cache_key = f"room:{room_name}:msgs:{limit}:{skip}"
+        messages = await self._get_cached_messages(cache_key)
+        if messages is None:
             messages = await self.chat_repository.get_messages_by_room(
                 room_name, limit, skip
             )
-            
-            self.log_operation("get_messages_by_room", {
-                "room_name": room_name,
-                "limit": limit,
-                "count": len(messages)
-            })
-            
-            return messages
-            
-        except Exception as e:
-            self.log_error("get_messages_by_room", e, {
-                "room_name": room_name,
-                "limit": limit
-            })
-            raise
+            await self._cache_messages(room_name, cache_key, messages)
+        
+        self.logger.info(
+            "Operation: get_messages_by_room room=%s limit=%s count=%s",
+            room_name, limit, len(messages)
+        )
+        
+        return messages
+    
+    @log_errors("get_messages_before", "room_name", "limit")
+    async def get_messages_before(
+        self, 
+        room_name: str, 
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None
+    ) -> List[Message]:
+        """Get the latest messages in a room, paging backwards from a (created_at, id) cursor."""
+        cursor_key = f"{before[0].isoformat()}:{before[1]}" if before else "latest"
+        cache_key = f"room:{room_name}:msgs:before:{limit}:{cursor_key}"
+        messages = await self._get_cached_messages(cache_key)
+        if messages is None:
+            messages = await self.chat_repository.get_messages_before(
+                room_name, limit, before
+            )
+            await self._cache_messages(room_name, cache_key, messages)
+        
+        self.logger.info(
+            "Operation: get_messages_before room=%s limit=%s count=%s",
+            room_name, limit, len(messages)
+        )
+        
+        return messages
     
+    @log_errors("get_messages_by_user", "user_id", "limit")
     async def get_messages_by_user(
         self, 
         user_id: str, 
@@ -159,26 +201,18 @@ class ChatService(BaseService[Message]):
         skip: int = 0
     ) -> List[Message]:
         """Get messages by user."""
-        try:
-            messages = await self.chat_repository.get_messages_by_user(
-                user_id, limit, skip
-            )
-            
-            self.log_operation("get_messages_by_user", {
-                "user_id": user_id,
-                "limit": limit,
-                "count": len(messages)
-            })
-            
-            return messages
-            
-        except Exception as e:
-            self.log_error("get_messages_by_user", e, {
-                "user_id": user_id,
-                "limit": limit
-            })
-            raise
+        messages = await self.chat_repository.get_messages_by_user(
+            user_id, limit, skip
+        )
+        
+        self.logger.info(
+            "Operation: get_messages_by_user user=%s limit=%s count=%s",
+            user_id, limit, len(messages)
+        )
+        
+        return messages
     
+    @log_errors("search_messages", "room_name", "search_term")
     async def search_messages(
         self, 
         room_name: str, 
@@ -186,29 +220,31 @@ class ChatService(BaseService[Message]):
         limit: int = 50
     ) -> List[Message]:
         """Search messages in a room."""
-        try:
-            if not search_term.strip():
-                return []
-            
+        if not search_term.strip():
+            return []
+        
+        messages = None
+        if message_search.get_search_client() is not None:
+            try:
+                results = await message_search.search_messages(room_name, search_term, limit)
+                messages = [self.chat_repository._dict_to_entity(data) for data in results]
+            except Exception as e:
+                self.log_error("search_messages_elasticsearch", e, {"room_name": room_name})
+        
+        # Fall back to MongoDB text search when Elasticsearch is unavailable
+        if messages is None:
             messages = await self.chat_repository.search_messages(
                 room_name, search_term, limit
             )
-            
-            self.log_operation("search_messages", {
-                "room_name": room_name,
-                "search_term": search_term,
-                "count": len(messages)
-            })
-            
-            return messages
-            
-        except Exception as e:
-            self.log_error("search_messages", e, {
-                "room_name": room_name,
-                "search_term": search_term
-            })
-            raise
+        
+        self.logger.info(
+            "Operation: search_messages room=%s term=%r count=%s",
+            room_name, search_term, len(messages)
+        )
+        
+        return messages
     
+    @log_errors("get_recent_messages", "room_name", "since")
     async def get_recent_messages(
         self, 
         room_name: str, 
@@ -216,92 +252,113 @@ class ChatService(BaseService[Message]):
         limit: int = 100
     ) -> List[Message]:
         """Get recent messages since a specific time."""
-        try:
-            messages = await self.chat_repository.get_recent_messages(
-                room_name, since, limit
-            )
-            
-            self.log_operation("get_recent_messages", {
-                "room_name": room_name,
-                "since": since.isoformat(),
-                "count": len(messages)
-            })
-            
-            return messages
-            
-        except Exception as e:
-            self.log_error("get_recent_messages", e, {
-                "room_name": room_name,
-                "since": since.isoformat()
-            })
-            raise
+        messages = await self.chat_repository.get_recent_messages(
+            room_name, since, limit
+        )
+        
+        self.logger.info(
+            "Operation: get_recent_messages room=%s since=%s count=%s",
+            room_name, since, len(messages)
+        )
+        
+        return messages
     
+    @log_errors("send_message", "room_name", "user", "message_type")
     async def send_message(
         self, 
         content: str, 
         room_name: str, 
         user: User,
         message_type: MessageType = MessageType.TEXT,
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        exclude_client: Optional[str] = None
     ) -> Message:
-        """Send a message and broadcast it."""
-        try:
-            # Create message
-            message_data = {
-                "content": content,
-                "room_name": room_name,
-                "user": {
-                    "id": user.id,
-                    "name": user.name,
-                    "avatar": user.avatar
-                },
-                "message_type": message_type.value,
-                "metadata": metadata or {}
+        """Send a message and broadcast it, optionally skipping the sender's own connection."""
+        self.validate_field_length(content, 'content', 1000)
+        
+        # Build the entity directly; user and type are already structured but still sanitized
+        message = Message(
+            id=self.generate_id(),
+            content=self.sanitize_string(content),
+            room_name=room_name,
+            user=User(id=user.id, name=self.sanitize_string(user.name), avatar=user.avatar),
+            message_type=message_type,
+            metadata={
+                key: self.sanitize_string(value) if isinstance(value, str) else value
+                for key, value in (metadata or {}).items()
             }
-            
-            message = await self.create(message_data)
-            
-            # Broadcast message if WebSocket service is available
-            if self.websocket_service:
-                await self.websocket_service.broadcast_message(room_name, message)
-            
-            return message
-            
-        except Exception as e:
-            self.log_error("send_message", e, {
-                "room_name": room_name,
-                "user_id": user.id,
-                "message_type": message_type.value
-            })
-            raise
+        )
+        
+        if not self.websocket_service:
+            return await self._persist(message)
+        
+        # Broadcast while the write is in flight instead of after it
+        persisted, broadcast = await asyncio.gather(
+            self._persist(message),
+            self.websocket_service.broadcast_message(
+                room_name, {"type": "message", "data": message.to_dict()}, exclude_client
+            ),
+            return_exceptions=True
+        )
+        if isinstance(persisted, Exception):
+            await self.websocket_service.broadcast_message(
+                room_name, {"type": "message_failed", "data": {"id": message.id}}
+            )
+            raise persisted
+        if isinstance(broadcast, Exception):
+            # The message is saved; clients that missed it pick it up on their next fetch
+            self.log_error("send_message", broadcast, {"room_name": room_name, "message_id": message.id})
+        
+        return message
     
+    @log_errors("get_room_statistics", "room_name")
     async def get_room_statistics(self, room_name: str) -> Dict[str, Any]:
         """Get room statistics."""
+        today = _today_midnight()
+        
+        # Independent queries run concurrently; type counts are aggregated server-side
+        total_messages, message_types, last_activity = await asyncio.gather(
+            self.chat_repository.get_message_count_by_room(room_name),
+            self.chat_repository.aggregate_types_since(room_name, today),
+            self.chat_repository.get_last_message_time(room_name)
+        )
+        
+        stats = {
+            "total_messages": total_messages,
+            "messages_today": sum(message_types.values()),
+            "message_types": message_types,
+            "last_activity": last_activity
+        }
+        
+        return stats
+    
+    async def _get_cached_messages(self, key: str) -> Optional[List[Message]]:
+        """Get a cached page of room messages, or None on miss."""
         try:
-            total_messages = await self.chat_repository.get_message_count_by_room(room_name)
-            
-            # Get recent messages for activity analysis
-            recent_messages = await self.get_recent_messages(
-                room_name, 
-                datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
-                limit=1000
-            )
-            
-            # Count messages by type
-            message_types = {}
-            for message in recent_messages:
-                msg_type = message.message_type.value
-                message_types[msg_type] = message_types.get(msg_type, 0) + 1
-            
-            stats = {
-                "total_messages": total_messages,
-                "messages_today": len(recent_messages),
-                "message_types": message_types,
-                "last_activity": recent_messages[-1].created_at if recent_messages else None
-            }
-            
-            return stats
-            
+            cached = await self.cache.get(key)
+        except Exception as e:
+            self.log_error("_get_cached_messages", e, {"key": key})
+            return None
+        
+        if cached is None:
+            return None
+        return [self.chat_repository._dict_to_entity(data) for data in orjson.loads(cached)]
+    
+    async def _cache_messages(self, room_name: str, key: str, messages: List[Message]) -> None:
+        """Cache a page of room messages and track its key for invalidation."""
+        try:
+            async with self.cache.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ROOM_CACHE_TTL, orjson.dumps([m.to_dict() for m in messages]))
+                pipe.sadd(f"room:{room_name}:msgs:keys", key)
+                pipe.expire(f"room:{room_name}:msgs:keys", ROOM_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            self.log_error("_cache_messages", e, {"key": key})
+    
+    async def _invalidate_room_cache(self, room_name: str) -> None:
+        """Drop all cached message pages for a room."""
+        try:
+            await self.cache.eval(_INVALIDATE_ROOM_SCRIPT, 1, f"room:{room_name}:msgs:keys")
         except Exception as e:
-            self.log_error("get_room_statistics", e, {"room_name": room_name})
-            raise
\ No newline at end of file
+            # The cache is optional; an unreachable Redis should not flood the log with traces
+            self.logger.warning("Room cache invalidation failed for %s: %s", room_name, e)
@@ -0,0 +1,103 @@
+"""
+Document batcher implementation.
+Coalesces concurrent document_store writes into bulk inserts.
+"""
+import asyncio
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+FLUSH_INTERVAL_MS = 50
+MAX_BATCH_SIZE = 100
+
+
+class DocumentBatcher:
+    """Buffers document records briefly and writes them with one insert_many."""
+    
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Flushes run detached; holding them here keeps them from being collected
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def add(self, record: Dict[str, Any]) -> Any:
+        """Queue a record and wait until it is written; returns its inserted _id."""
+        inserted = asyncio.get_running_loop().create_future()
+        self._pending.append((record, inserted))
+        
+        if len(self._pending) >= MAX_BATCH_SIZE:
+            # Flush in its own task so cancelling this upload cannot strand the rest of the batch
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            self._spawn(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        
+        return await asyncio.shield(inserted)
+    
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run a coroutine as a retained background task."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _flush_later(self) -> None:
+        """Flush the current batch after the coalescing window."""
+        await asyncio.sleep(FLUSH_INTERVAL_MS / 1000)
+        self._flush_task = None
+        await self._flush()
+    
+    async def _flush(self) -> None:
+        """Write all pending records and resolve each waiter with its own outcome."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        
+        try:
+            await self._write_batch(batch)
+        finally:
+            # Nothing may be left waiting, even if the flush itself was cancelled
+            for _, inserted in batch:
+                if not inserted.done():
+                    inserted.set_exception(Exception("Document batch was not written"))
+    
+    async def _write_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Insert one batch of records and resolve their waiters."""
+        failed: Dict[int, Exception] = {}
+        try:
+            await self.collection.insert_many([record for record, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past a bad record, so only its writer fails
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = Exception(error.get("errmsg", "write failed"))
+            logger.error(f"Error writing {len(failed)} of {len(batch)} documents: {e}")
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(batch)} documents: {e}")
+            failed = dict.fromkeys(range(len(batch)), e)
+        
+        for index, (record, inserted) in enumerate(batch):
+            if index in failed:
+                inserted.set_exception(failed[index])
+            else:
+                # insert_many fills in _id on each record that did not carry one
+                inserted.set_result(record["_id"])
+
+
+# Shared across uploads so concurrent requests land in the same batch
+_document_batcher: Optional[DocumentBatcher] = None
+
+
+def get_document_batcher(collection: AsyncIOMotorCollection) -> DocumentBatcher:
+    """Get the process-wide document batcher."""
+    global _document_batcher
+    if _document_batcher is None:
+        _document_batcher = DocumentBatcher(collection)
+    return _document_batcher
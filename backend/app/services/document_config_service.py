@@ -2,12 +2,172 @@
 Document Configuration Service
 Handles fetching document type configurations from MongoDB
 """
-from typing import Optional, Dict, Any, List
+import hashlib
+import json
+import time
+from types import MappingProxyType
+from collections import Counter
+from typing import Optional, Dict, Any, Hashable, List, Mapping, NamedTuple, Tuple
+from jinja2 import Template
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Configs change rarely; cache fetched configs and generated prompts in-process.
+# Writes through this process call clear_cache(); edits made elsewhere show up within the TTL.
+CONFIG_CACHE_TTL = 60
+PROMPT_CACHE_SIZE = 32
+_config_cache: Dict[str, tuple] = {}
+_prompt_cache: Dict[Hashable, str] = {}
+
+# Points deducted per issue; single source for the prompt and the fallback score
+SEVERITY_WEIGHTS = {"critical": 3, "major": 2, "minor": 1}
+
+SYSTEM_PROMPT_FOOTER = f"""
+IMPORTANT SCORING INSTRUCTIONS:
+- Start with a baseline compliance score of 100 points
+- Only deduct points when you find actual compliance issues
+- If NO issues are found, the score should remain 100
+- Deduct points based on severity:
+  * Critical issues: -{SEVERITY_WEIGHTS['critical']} points each
+  * Major issues: -{SEVERITY_WEIGHTS['major']} points each  
+  * Minor issues: -{SEVERITY_WEIGHTS['minor']} points each
+""" + """
+For each section, analyze if it exists in the document and if it meets the specified rules.
+For each rule violation, note the severity level (critical, major, minor).
+Only report issues that are actual violations - do not create issues if the document is compliant.
+
+Provide your analysis in the following JSON format:
+{
+    "sections_analysis": [
+        {
+            "section_name": "Section Name",
+            "found": true/false,
+            "compliance_status": "compliant/non_compliant/missing",
+            "issues": [
+                {
+                    "rule_name": "Rule Name",
+                    "severity": "critical/major/minor",
+                    "description": "Issue description",
+                    "suggestion": "How to fix this issue"
+                }
+            ]
+        }
+    ],
+    "overall_compliance": "compliant/partially_compliant/non_compliant",
+    "summary": "Brief summary of compliance status",
+    "compliance_score": 100
+}
+
+CRITICAL: Include the "compliance_score" field in your response. Calculate it as:
+- Start with 100 points
+- Subtract points only for actual issues found
+- If no issues are found, return 100"""
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize frozen config mappings when hashing a config; anything else as text"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively make a fetched config read-only so cached copies can be shared"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class RuleConfig(NamedTuple):
+    """Active rule of a configured section."""
+    name: str
+    description: str
+    severity: str
+
+
+class SectionConfig(NamedTuple):
+    """Configured document section with its active rules."""
+    name: str
+    description: str
+    is_required: bool
+    has_rules: bool
+    rules: Tuple[RuleConfig, ...]
+
+
+def _parse_sections(config: Dict[str, Any]) -> List[SectionConfig]:
+    """Read section and rule fields once so prompt building only does attribute access"""
+    return [
+        SectionConfig(
+            name=section.get('name', ''),
+            description=section.get('description', ''),
+            is_required=section.get('is_required', False),
+            has_rules=bool(section.get('rules')),
+            rules=tuple(
+                RuleConfig(
+                    name=rule.get('name', ''),
+                    description=rule.get('description', ''),
+                    severity=rule.get('severity', 'minor')
+                )
+                for rule in section.get('rules', [])
+                if rule.get('is_active', True)
+            )
+        )
+        for section in config.get('sections', [])
+    ]
+
+STATUS_EMOJI = {"compliant": "✅", "partially_compliant": "⚠️"}
+SEVERITY_EMOJI = {"critical": "🔴", "major": "🟡"}
+
+# Compiled once at import; rendering reuses the compiled template
+COMPLIANCE_REPORT_TEMPLATE = Template(
+    """# Document Compliance Analysis Report
+
+## Document Type: {{ document_type }}
+**Compliance Score: {{ score }}/100**
+
+### Overall Status: {{ overall }}
+
+{{ summary }}
+
+## Section Analysis
+
+{% for section in sections %}
+{% set status = section.get('compliance_status', 'unknown') %}
+{% set issues = section.get('issues', []) %}
+### {{ status_emoji.get(status, '❌') }} {{ section.get('section_name', 'Unknown Section') }}
+
+**Status:** {{ status.replace('_', ' ').title() }}
+**Found in Document:** {{ 'Yes' if section.get('found', False) else 'No' }}
+
+{% if issues %}
+**Issues Found:**
+
+{% for issue in issues %}
+{% set severity = issue.get('severity', 'minor') %}
+- {{ severity_emoji.get(severity, '🟠') }} **{{ issue.get('rule_name', 'Unknown Rule') }}** ({{ severity.title() }})
+  - **Issue:** {{ issue.get('description', 'No description') }}
+  - **Suggestion:** {{ issue.get('suggestion', 'No suggestion provided') }}
+
+{% endfor %}
+{% else %}
+No issues found for this section.
+
+{% endif %}
+{% endfor %}
+
+**Final Score: {{ score }}/100**
+""",
+    autoescape=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True
+)
+
 class DocumentConfigService:
     """Service for managing document type configurations"""
     
@@ -15,17 +175,53 @@ class DocumentConfigService:
         self.database = database
         self.collection = database.document_type_configuration
     
-    async def get_first_document_config(self) -> Optional[Dict[str, Any]]:
+    async def ensure_indexes(self) -> None:
+        """Create indexes backing the config lookups by code and id"""
+        try:
+            await self.collection.create_indexes([
+                # Not unique: existing collections may already hold duplicate codes
+                IndexModel([("code", 1)]),
+                IndexModel([("id", 1)])
+            ])
+        except Exception as e:
+            logger.error(f"Error creating document configuration indexes: {e}")
+            raise
+    
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop cached configs and prompts, e.g. after a configuration change"""
+        _config_cache.clear()
+        _prompt_cache.clear()
+    
+    @staticmethod
+    def _get_cached_config(key: str) -> Optional[Mapping[str, Any]]:
+        """Get an unexpired cached config"""
+        entry = _config_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+    
+    @staticmethod
+    def _set_cached_config(key: str, config: Mapping[str, Any]) -> None:
+        """Cache a fetched config for CONFIG_CACHE_TTL seconds"""
+        _config_cache[key] = (time.monotonic() + CONFIG_CACHE_TTL, config)
+    
+    async def get_first_document_config(self) -> Optional[Mapping[str, Any]]:
         """
         Get the first document type configuration from the database
         Returns the configuration that will be used for compliance analysis
         """
+        cached = self._get_cached_config("__first__")
+        if cached is not None:
+            return cached
+        
         try:
             config = await self.collection.find_one({})
             if config:
-                # Convert ObjectId to string for JSON serialization
-                config['_id'] = str(config['_id'])
+                # _id is decoded to str by the database codec; share the cached config read-only
+                config = _freeze(config)
                 logger.info(f"Retrieved document config: {config.get('code', 'Unknown')}")
+                self._set_cached_config("__first__", config)
                 return config
             else:
                 logger.warning("No document type configuration found in database")
@@ -34,14 +230,19 @@ class DocumentConfigService:
             logger.error(f"Error fetching document configuration: {e}")
             raise
     
-    async def get_document_config_by_code(self, code: str) -> Optional[Dict[str, Any]]:
+    async def get_document_config_by_code(self, code: str) -> Optional[Mapping[str, Any]]:
         """
         Get document type configuration by code
         """
+        cached = self._get_cached_config(code)
+        if cached is not None:
+            return cached
+        
         try:
             config = await self.collection.find_one({"code": code})
             if config:
-                config['_id'] = str(config['_id'])
+                config = _freeze(config)
+                self._set_cached_config(code, config)
                 return config
             return None
         except Exception as e:
@@ -55,81 +256,49 @@ class DocumentConfigService:
         if not config:
             return "Analyze the document for general compliance issues."
         
+        # A stored config is versioned by its updated_at; anything else is keyed by content
+        config_id, updated_at = config.get('id'), config.get('updated_at')
+        if config_id and updated_at:
+            cache_key = (config_id, str(updated_at))
+        else:
+            cache_key = hashlib.blake2b(
+                json.dumps(config, sort_keys=True, default=_json_default).encode("utf-8"),
+                digest_size=16
+            ).digest()
+        cached = _prompt_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         document_type = config.get('name', 'Document')
         description = config.get('description', '')
-        sections = config.get('sections', [])
+        sections = _parse_sections(config)
         
-        prompt = f"""You are a document compliance analyzer for {document_type} documents.
-
-Document Type: {document_type}
-Description: {description}
-
-Your task is to analyze the provided document content and check compliance against the following sections and rules:
-
-"""
+        parts = [
+            f"You are a document compliance analyzer for {document_type} documents.\n\n"
+            f"Document Type: {document_type}\n"
+            f"Description: {description}\n\n"
+            "Your task is to analyze the provided document content and check compliance against the following sections and rules:\n\n"
+        ]
+        append = parts.append
         
         for section in sections:
-            section_name = section.get('name', '')
-            section_desc = section.get('description', '')
-            is_required = section.get('is_required', False)
-            rules = section.get('rules', [])
+            append(f"\n## Section: {section.name}\n")
+            append(f"Description: {section.description}\n")
+            append(f"Required: {'Yes' if section.is_required else 'No'}\n")
             
-            prompt += f"\n## Section: {section_name}\n"
-            prompt += f"Description: {section_desc}\n"
-            prompt += f"Required: {'Yes' if is_required else 'No'}\n"
+            if section.has_rules:
+                append("Rules to check:\n")
+                for rule in section.rules:
+                    append(f"- {rule.name} (Severity: {rule.severity}): {rule.description}\n")
             
-            if rules:
-                prompt += "Rules to check:\n"
-                for rule in rules:
-                    if rule.get('is_active', True):
-                        rule_name = rule.get('name', '')
-                        rule_desc = rule.get('description', '')
-                        severity = rule.get('severity', 'minor')
-                        prompt += f"- {rule_name} (Severity: {severity}): {rule_desc}\n"
-            
-            prompt += "\n"
+            append("\n")
         
-        prompt += """
-IMPORTANT SCORING INSTRUCTIONS:
-- Start with a baseline compliance score of 100 points
-- Only deduct points when you find actual compliance issues
-- If NO issues are found, the score should remain 100
-- Deduct points based on severity:
-  * Critical issues: -3 points each
-  * Major issues: -2 points each  
-  * Minor issues: -1 points each
-
-For each section, analyze if it exists in the document and if it meets the specified rules.
-For each rule violation, note the severity level (critical, major, minor).
-Only report issues that are actual violations - do not create issues if the document is compliant.
-
-Provide your analysis in the following JSON format:
-{
-    "sections_analysis": [
-        {
-            "section_name": "Section Name",
-            "found": true/false,
-            "compliance_status": "compliant/non_compliant/missing",
-            "issues": [
-                {
-                    "rule_name": "Rule Name",
-                    "severity": "critical/major/minor",
-                    "description": "Issue description",
-                    "suggestion": "How to fix this issue"
-                }
-            ]
-        }
-    ],
-    "overall_compliance": "compliant/partially_compliant/non_compliant",
-    "summary": "Brief summary of compliance status",
-    "compliance_score": 100
-}
-
-CRITICAL: Include the "compliance_score" field in your response. Calculate it as:
-- Start with 100 points
-- Subtract points only for actual issues found
-- If no issues are found, return 100"""
+        append(SYSTEM_PROMPT_FOOTER)
+        prompt = "".join(parts)
         
+        if len(_prompt_cache) >= PROMPT_CACHE_SIZE:
+            _prompt_cache.pop(next(iter(_prompt_cache)))
+        _prompt_cache[cache_key] = prompt
         return prompt
     
     def calculate_compliance_score(self, analysis_result: Dict[str, Any]) -> float:
@@ -145,20 +314,12 @@ CRITICAL: Include the "compliance_score" field in your response. Calculate it as
             return float(analysis_result['compliance_score'])
         
         # Fallback calculation if AI didn't provide score
-        score = 100.0
-        
-        sections_analysis = analysis_result.get('sections_analysis', [])
-        
-        for section in sections_analysis:
-            issues = section.get('issues', [])
-            for issue in issues:
-                severity = issue.get('severity', 'minor').lower()
-                if severity == 'critical':
-                    score -= 3
-                elif severity == 'major':
-                    score -= 2
-                elif severity == 'minor':
-                    score -= 1
+        counts = Counter(
+            issue.get('severity', 'minor').lower()
+            for section in analysis_result.get('sections_analysis', [])
+            for issue in section.get('issues', [])
+        )
+        score = 100.0 - sum(SEVERITY_WEIGHTS.get(severity, 0) * n for severity, n in counts.items())
         
         # Ensure score doesn't go below 0
         return max(0.0, score)
@@ -167,49 +328,12 @@ CRITICAL: Include the "compliance_score" field in your response. Calculate it as
         """
         Format the compliance analysis as a markdown report
         """
-        document_type = document_config.get('name', 'Document')
-        
-        report = f"""# Document Compliance Analysis Report
-
-## Document Type: {document_type}
-**Compliance Score: {compliance_score:.1f}/100**
-
-### Overall Status: {analysis_result.get('overall_compliance', 'Unknown').title()}
-
-{analysis_result.get('summary', 'No summary available')}
-
-## Section Analysis
-
-"""
-        
-        sections_analysis = analysis_result.get('sections_analysis', [])
-        
-        for section in sections_analysis:
-            section_name = section.get('section_name', 'Unknown Section')
-            found = section.get('found', False)
-            compliance_status = section.get('compliance_status', 'unknown')
-            issues = section.get('issues', [])
-            
-            status_emoji = "✅" if compliance_status == "compliant" else "⚠️" if compliance_status == "partially_compliant" else "❌"
-            
-            report += f"### {status_emoji} {section_name}\n\n"
-            report += f"**Status:** {compliance_status.replace('_', ' ').title()}\n"
-            report += f"**Found in Document:** {'Yes' if found else 'No'}\n\n"
-            
-            if issues:
-                report += "**Issues Found:**\n\n"
-                for issue in issues:
-                    severity = issue.get('severity', 'minor')
-                    severity_emoji = "🔴" if severity == "critical" else "🟡" if severity == "major" else "🟠"
-                    
-                    report += f"- {severity_emoji} **{issue.get('rule_name', 'Unknown Rule')}** ({severity.title()})\n"
-                    report += f"  - **Issue:** {issue.get('description', 'No description')}\n"
-                    report += f"  - **Suggestion:** {issue.get('suggestion', 'No suggestion provided')}\n\n"
-            else:
-                report += "No issues found for this section.\n\n"
-
-
-        
-        report += f"\n**Final Score: {compliance_score:.1f}/100**\n"
-        
-        return report
+        return COMPLIANCE_REPORT_TEMPLATE.render(
+            document_type=document_config.get('name', 'Document'),
+            score=f"{compliance_score:.1f}",
+            overall=analysis_result.get('overall_compliance', 'Unknown').title(),
+            summary=analysis_result.get('summary', 'No summary available'),
+            sections=analysis_result.get('sections_analysis', []),
+            status_emoji=STATUS_EMOJI,
+            severity_emoji=SEVERITY_EMOJI
+        )
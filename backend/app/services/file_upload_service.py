@@ -2,11 +2,14 @@
 File upload service implementation.
 Handles file upload operations and processing.
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, FrozenSet, Iterator, Optional, List, Mapping, Set, Tuple
+import asyncio
 import os
+import re
 import uuid
 import aiofiles
 from pathlib import Path
+from types import MappingProxyType
 from datetime import datetime
 
 from app.services.base_service import BaseService
@@ -16,29 +19,61 @@ from app.core.logging import get_logger
 logger = get_logger(__name__)
 
 
+def _iter_files(root: str) -> Iterator[os.DirEntry]:
+    """Recursively yield file entries under root; unreadable directories are skipped like os.walk."""
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_files(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    except OSError:
+        return
+
+
+def _safe_unlink(file_path: str) -> bool:
+    """Remove a file, returning False if it was already gone."""
+    try:
+        os.remove(file_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# Maximum file size (10MB)
+_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+# Default upload directory
+_DEFAULT_UPLOAD_DIR = "uploaded-files"
+
+# Allowed file types and their extensions
+_ALLOWED_TYPES: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    'application/pdf': frozenset({'.pdf'}),
+    'application/msword': frozenset({'.doc'}),
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': frozenset({'.docx'}),
+    'text/plain': frozenset({'.txt'}),
+    'application/vnd.ms-excel': frozenset({'.xls'}),
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': frozenset({'.xlsx'}),
+    'application/vnd.ms-powerpoint': frozenset({'.ppt'}),
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': frozenset({'.pptx'})
+})
+
+# Path traversal and reserved characters, matched in a single pass
+_DANGEROUS_FILENAME_RE = re.compile(r'\.\.|[/\\:*?"<>|]')
+
+# Upload directories already created in this process; services are built per request
+_created_dirs: Set[str] = set()
+
+
 class FileUploadService(BaseService[None]):
     """Service for file upload operations."""
     
-    def __init__(self):
-        super().__init__()
-        
-        # Allowed file types and their extensions
-        self.allowed_types = {
-            'application/pdf': ['.pdf'],
-            'application/msword': ['.doc'],
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': ['.docx'],
-            'text/plain': ['.txt'],
-            'application/vnd.ms-excel': ['.xls'],
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
-            'application/vnd.ms-powerpoint': ['.ppt'],
-            'application/vnd.openxmlformats-officedocument.presentationml.presentation': ['.pptx']
-        }
-        
-        # Maximum file size (10MB)
-        self.max_file_size = 10 * 1024 * 1024
-        
-        # Default upload directory
-        self.upload_dir = "uploaded-files"
+    # Validation data is built once at import and shared by all instances
+    allowed_types = _ALLOWED_TYPES
+    supported_type_list = tuple(_ALLOWED_TYPES)
+    max_file_size = _MAX_FILE_SIZE
+    upload_dir = _DEFAULT_UPLOAD_DIR
     
     async def validate_file(
         self, 
@@ -58,7 +93,7 @@ class FileUploadService(BaseService[None]):
             if content_type not in self.allowed_types:
                 raise ValidationError(
                     f"File type {content_type} not supported",
-                    {"supported_types": list(self.allowed_types.keys())}
+                    {"supported_types": self.supported_type_list}
                 )
             
             # Check file extension
@@ -68,7 +103,7 @@ class FileUploadService(BaseService[None]):
             if file_extension not in allowed_extensions:
                 raise ValidationError(
                     f"File extension {file_extension} not allowed for content type {content_type}",
-                    {"allowed_extensions": allowed_extensions}
+                    {"allowed_extensions": sorted(allowed_extensions)}
                 )
             
             # Validate filename
@@ -76,10 +111,9 @@ class FileUploadService(BaseService[None]):
                 raise ValidationError("Invalid filename")
             
             # Check for dangerous characters in filename
-            dangerous_chars = ['..', '/', '\\', ':', '*', '?', '"', '<', '>', '|']
-            for char in dangerous_chars:
-                if char in filename:
-                    raise ValidationError(f"Filename contains dangerous character: {char}")
+            dangerous = _DANGEROUS_FILENAME_RE.search(filename)
+            if dangerous:
+                raise ValidationError(f"Filename contains dangerous character: {dangerous.group()}")
             
             return {
                 "valid": True,
@@ -115,7 +149,9 @@ class FileUploadService(BaseService[None]):
             
             # Set upload directory
             target_dir = upload_dir or self.upload_dir
-            os.makedirs(target_dir, exist_ok=True)
+            if target_dir not in _created_dirs:
+                await asyncio.to_thread(os.makedirs, target_dir, exist_ok=True)
+                _created_dirs.add(target_dir)
             
             # Generate unique filename
             file_extension = validation_result["file_extension"]
@@ -126,8 +162,8 @@ class FileUploadService(BaseService[None]):
             async with aiofiles.open(file_path, 'wb') as f:
                 await f.write(file_content)
             
-            # Get file stats
-            file_stats = os.stat(file_path)
+            # The file was just written, so its stats are known without a stat call
+            now = datetime.now().isoformat()
             
             result = {
                 "original_filename": filename,
@@ -136,19 +172,18 @@ class FileUploadService(BaseService[None]):
                 "content_type": content_type,
                 "size": len(file_content),
                 "file_extension": file_extension,
-                "uploaded_at": datetime.now().isoformat(),
+                "uploaded_at": now,
                 "file_stats": {
-                    "size_on_disk": file_stats.st_size,
-                    "created_at": datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-                    "modified_at": datetime.fromtimestamp(file_stats.st_mtime).isoformat()
+                    "size_on_disk": len(file_content),
+                    "created_at": now,
+                    "modified_at": now
                 }
             }
             
-            self.log_operation("save_file", {
-                "original_filename": filename,
-                "saved_filename": unique_filename,
-                "size": len(file_content)
-            })
+            self.logger.info(
+                "Operation: save_file original=%s saved=%s size=%s",
+                filename, unique_filename, len(file_content)
+            )
             
             return result
             
@@ -163,13 +198,11 @@ class FileUploadService(BaseService[None]):
     async def delete_file(self, file_path: str) -> bool:
         """Delete a file from disk."""
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
-                self.log_operation("delete_file", {"file_path": file_path})
-                return True
+            deleted = await asyncio.to_thread(_safe_unlink, file_path)
+            if deleted:
+                self.logger.info("Operation: delete_file path=%s", file_path)
             
-            return False
+            return deleted
             
         except Exception as e:
             self.log_error("delete_file", e, {"file_path": file_path})
@@ -178,11 +211,11 @@ class FileUploadService(BaseService[None]):
     async def get_file_info(self, file_path: str) -> Optional[Dict[str, Any]]:
         """Get file information."""
         try:
-            if not os.path.exists(file_path):
+            try:
+                file_stats = await asyncio.to_thread(os.stat, file_path)
+            except FileNotFoundError:
                 return None
             
-            file_stats = os.stat(file_path)
-            
             return {
                 "file_path": file_path,
                 "filename": os.path.basename(file_path),
@@ -199,19 +232,8 @@ class FileUploadService(BaseService[None]):
     async def cleanup_old_files(self, days_old: int = 30) -> int:
         """Clean up files older than specified days."""
         try:
-            cleaned_count = 0
             cutoff_time = datetime.now().timestamp() - (days_old * 24 * 60 * 60)
-            
-            for root, dirs, files in os.walk(self.upload_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_time = os.path.getmtime(file_path)
-                        if file_time < cutoff_time:
-                            os.remove(file_path)
-                            cleaned_count += 1
-                    except Exception as e:
-                        self.log_error("cleanup_old_files_individual", e, {"file_path": file_path})
+            cleaned_count = await asyncio.to_thread(self._cleanup_old_files_sync, cutoff_time)
             
             if cleaned_count > 0:
                 self.log_operation("cleanup_old_files", {
@@ -225,27 +247,22 @@ class FileUploadService(BaseService[None]):
             self.log_error("cleanup_old_files", e, {"days_old": days_old})
             return 0
     
+    def _cleanup_old_files_sync(self, cutoff_time: float) -> int:
+        """Remove files modified before the cutoff; runs in a worker thread."""
+        cleaned_count = 0
+        for entry in _iter_files(self.upload_dir):
+            try:
+                if entry.stat().st_mtime < cutoff_time:
+                    os.remove(entry.path)
+                    cleaned_count += 1
+            except Exception as e:
+                self.log_error("cleanup_old_files_individual", e, {"file_path": entry.path})
+        return cleaned_count
+    
     async def get_upload_stats(self) -> Dict[str, Any]:
         """Get upload statistics."""
         try:
-            total_files = 0
-            total_size = 0
-            file_types = {}
-            
-            for root, dirs, files in os.walk(self.upload_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_stats = os.stat(file_path)
-                        total_files += 1
-                        total_size += file_stats.st_size
-                        
-                        # Count by file extension
-                        file_ext = Path(file).suffix.lower()
-                        file_types[file_ext] = file_types.get(file_ext, 0) + 1
-                        
-                    except Exception as e:
-                        self.log_error("get_upload_stats_individual", e, {"file_path": file_path})
+            total_files, total_size, file_types = await asyncio.to_thread(self._scan_upload_dir)
             
             return {
                 "total_files": total_files,
@@ -265,9 +282,29 @@ class FileUploadService(BaseService[None]):
                 "upload_dir": self.upload_dir
             }
     
+    def _scan_upload_dir(self) -> Tuple[int, int, Dict[str, int]]:
+        """Count files, bytes and extensions in the upload dir; runs in a worker thread."""
+        total_files = 0
+        total_size = 0
+        file_types = {}
+        
+        for entry in _iter_files(self.upload_dir):
+            try:
+                total_size += entry.stat().st_size
+                total_files += 1
+                
+                # Count by file extension
+                file_ext = Path(entry.name).suffix.lower()
+                file_types[file_ext] = file_types.get(file_ext, 0) + 1
+                
+            except Exception as e:
+                self.log_error("get_upload_stats_individual", e, {"file_path": entry.path})
+        
+        return total_files, total_size, file_types
+    
     def get_supported_types(self) -> Dict[str, List[str]]:
         """Get supported file types and extensions."""
-        return self.allowed_types.copy()
+        return {content_type: sorted(exts) for content_type, exts in self.allowed_types.items()}
     
     def get_max_file_size(self) -> int:
         """Get maximum allowed file size."""
@@ -0,0 +1,150 @@
+"""
+Message batcher implementation.
+Coalesces concurrent message writes into bulk inserts and updates.
+"""
+import asyncio
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple
+
+from app.domain.entities.message import Message
+from app.repositories.chat_repository import ChatRepository
+from app.db.elasticsearch import index_messages
+from app.core.exceptions import DatabaseError
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+FLUSH_INTERVAL_MS = 20
+MAX_BATCH_SIZE = 100
+
+
+class MessageBatcher:
+    """Buffers messages and edits briefly and writes them with one insert_many / bulk_write."""
+    
+    def __init__(self, chat_repository: ChatRepository):
+        self.chat_repository = chat_repository
+        self._pending: List[Tuple[Message, asyncio.Future]] = []
+        self._pending_updates: List[Tuple[Message, Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Flushes and indexing run detached; holding them here keeps them from being collected
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def add(self, message: Message) -> None:
+        """Queue a message and wait until it has been written."""
+        written = asyncio.get_running_loop().create_future()
+        self._pending.append((message, written))
+        await self._wait_for(written)
+    
+    async def update(self, message: Message, patch: Dict[str, Any]) -> None:
+        """Queue a field update for an already-patched message and wait until it has been written."""
+        written = asyncio.get_running_loop().create_future()
+        self._pending_updates.append((message, patch, written))
+        await self._wait_for(written)
+    
+    async def _wait_for(self, written: asyncio.Future) -> None:
+        """Schedule or trigger the flush, then wait for this writer's outcome."""
+        if len(self._pending) + len(self._pending_updates) >= MAX_BATCH_SIZE:
+            # Flush in its own task so cancelling this writer cannot strand the rest of the batch
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            self._spawn(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        
+        await asyncio.shield(written)
+    
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run a coroutine as a retained background task."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _flush_later(self) -> None:
+        """Flush the current batch after the coalescing window."""
+        await asyncio.sleep(FLUSH_INTERVAL_MS / 1000)
+        self._flush_task = None
+        await self._flush()
+    
+    async def _flush(self) -> None:
+        """Write all pending messages and updates and resolve each waiter with its own outcome."""
+        batch, self._pending = self._pending, []
+        updates, self._pending_updates = self._pending_updates, []
+        if not batch and not updates:
+            return
+        
+        try:
+            await self._write_batch(batch, updates)
+        finally:
+            # Nothing may be left waiting, even if the flush itself was cancelled
+            for written in [written for _, written in batch] + [written for _, _, written in updates]:
+                if not written.done():
+                    written.set_exception(DatabaseError("Message batch was not written"))
+    
+    async def _write_batch(
+        self,
+        batch: List[Tuple[Message, asyncio.Future]],
+        updates: List[Tuple[Message, Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """Run the bulk insert and update for one batch and resolve their waiters."""
+        # Inserts go first so an edit to a message in the same batch finds it
+        messages = [message for message, _ in batch]
+        insert_failed = await self._write(self.chat_repository.bulk_create, messages, "messages") if messages else {}
+        for index, (_, written) in enumerate(batch):
+            self._resolve(written, insert_failed.get(index))
+        
+        indexed = [message for index, message in enumerate(messages) if index not in insert_failed]
+        
+        if updates:
+            update_failed = await self._write(
+                self.chat_repository.bulk_update,
+                [(message.id, patch) for message, patch, _ in updates],
+                "message updates"
+            )
+            for index, (_, _, written) in enumerate(updates):
+                self._resolve(written, update_failed.get(index))
+            # Edited messages are re-indexed whole so search sees the new content
+            indexed.extend(message for index, (message, _, _) in enumerate(updates) if index not in update_failed)
+        
+        # Search indexing runs detached so Elasticsearch latency stays off the request path
+        if indexed:
+            self._spawn(index_messages(indexed))
+    
+    @staticmethod
+    async def _write(write, items: List[Any], label: str) -> Dict[int, Exception]:
+        """Run a bulk write and map each failed item index to its error."""
+        try:
+            await write(items)
+            return {}
+        except DatabaseError as e:
+            write_errors = e.details.get("write_errors")
+            if write_errors is None:
+                logger.error(f"Error writing batch of {len(items)} {label}: {e}")
+                return dict.fromkeys(range(len(items)), e)
+            # Unordered bulk writes keep going past a bad item, so only its writer fails
+            logger.error(f"Error writing {len(write_errors)} of {len(items)} {label}: {e}")
+            return {error["index"]: DatabaseError(error.get("errmsg", "write failed")) for error in write_errors}
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(items)} {label}: {e}")
+            return dict.fromkeys(range(len(items)), e)
+    
+    @staticmethod
+    def _resolve(written: asyncio.Future, error: Optional[Exception]) -> None:
+        """Release a waiter with its write outcome."""
+        if error is not None:
+            written.set_exception(error)
+        else:
+            written.set_result(None)
+
+
+# Shared across ChatService instances so concurrent requests land in the same batch,
+# keyed by collection so each repository's writes go to its own collection
+_message_batchers: Dict[str, MessageBatcher] = {}
+
+
+def get_message_batcher(chat_repository: ChatRepository) -> MessageBatcher:
+    """Get the process-wide message batcher for a repository's collection."""
+    key = chat_repository.collection.full_name
+    if key not in _message_batchers:
+        _message_batchers[key] = MessageBatcher(chat_repository)
+    return _message_batchers[key]
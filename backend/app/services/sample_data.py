@@ -1,18 +1,14 @@
 # app/services/sample_data.py
-from app.db.mongodb import get_database
-from app.services.document_type_service import DocumentTypeService
-from app.models.chat import DocumentTypeCreate, DocumentSection, SectionRule
+from datetime import datetime
+from pymongo import UpdateOne
+from app.core.database import get_database
+from app.services.document_config_service import DocumentConfigService
+from app.models.chat import DocumentTypeCreate, DocumentTypeInDB, DocumentSection, SectionRule
 
 async def initialize_sample_data():
     """Initialize sample document type configurations"""
     db = await get_database()
-    service = DocumentTypeService(db)
-    
-    # Check if sample data already exists
-    existing_types = await service.get_document_types()
-    if existing_types:
-        print("Sample data already exists, skipping initialization")
-        return
+    collection = db.document_type_configuration
     
     # Create sample SOP document type
     sop_sections = [
@@ -154,9 +150,27 @@ async def initialize_sample_data():
     )
     
     try:
-        await service.create_document_type(sop_doc_type, "system")
-        await service.create_document_type(protocol_doc_type, "system")
-        print("Sample data initialized successfully")
+        await DocumentConfigService(db).ensure_indexes()
+        
+        # Upserts keyed on code insert only the missing types, in a single round trip
+        now = datetime.now()
+        sample_types = (sop_doc_type, protocol_doc_type)
+        result = await collection.bulk_write([
+            UpdateOne(
+                {"code": doc_type.code},
+                {"$setOnInsert": DocumentTypeInDB(
+                    **doc_type.model_dump(), created_at=now, updated_at=now, created_by="system"
+                ).model_dump()},
+                upsert=True
+            )
+            for doc_type in sample_types
+        ], ordered=False)
+        if result.upserted_count:
+            DocumentConfigService.clear_cache()
+        if result.upserted_count == len(sample_types):
+            print("Sample data initialized successfully")
+        else:
+            print(f"Sample data already exists, inserted {result.upserted_count} missing document types")
     except Exception as e:
         print(f"Error initializing sample data: {e}")
 
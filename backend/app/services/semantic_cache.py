@@ -0,0 +1,56 @@
+"""
+Semantic cache implementation.
+Handles reuse of AI responses for semantically similar prompts.
+"""
+import time
+from typing import List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """In-process cache of (embedding, response) pairs matched by cosine similarity."""
+
+    def __init__(self, threshold: float = 0.85, ttl_seconds: int = 86400, max_entries: int = 256):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Ring buffer of unit-length embeddings, one row per slot; allocated once the dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._responses: List[Optional[str]] = [None] * max_entries
+        self._stored_at = np.full(max_entries, -np.inf)
+        self._next_slot = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Scale an embedding to unit length."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector)) or 1.0
+        return vector / norm
+
+    def get(self, embedding: List[float]) -> Optional[str]:
+        """Get the cached response closest to the embedding, if similar enough."""
+        query = self._normalize(embedding)
+        if self._vectors is None or query.shape[0] != self._vectors.shape[1]:
+            return None
+
+        # One matrix-vector product scores every slot; empty and expired slots are masked out
+        scores = self._vectors @ query
+        scores[self._stored_at < time.monotonic() - self.ttl_seconds] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self._responses[best]
+
+    def add(self, embedding: List[float], response: str) -> None:
+        """Store a response under its prompt embedding, replacing the oldest entry when full."""
+        vector = self._normalize(embedding)
+        if self._vectors is None or vector.shape[0] != self._vectors.shape[1]:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._stored_at.fill(-np.inf)
+
+        slot = self._next_slot
+        self._vectors[slot] = vector
+        self._responses[slot] = response
+        self._stored_at[slot] = time.monotonic()
+        self._next_slot = (slot + 1) % self.max_entries
@@ -4,8 +4,8 @@ Handles real-time communication and WebSocket connections.
 """
 from typing import Dict, List, Any, Optional
 from fastapi import WebSocket
-import json
 import asyncio
+import orjson
 from datetime import datetime
 
 from app.services.base_service import BaseService
@@ -23,25 +23,23 @@ class WebSocketService(BaseService[None]):
         # Structure: {room_name: {client_id: websocket}}
         self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
         self.client_rooms: Dict[str, str] = {}  # client_id -> room_name
-        self._lock = asyncio.Lock()
     
     async def connect(self, websocket: WebSocket, client_id: str, room_name: str) -> bool:
         """Connect a client to a room."""
         try:
             await websocket.accept()
             
-            async with self._lock:
-                if room_name not in self.active_connections:
-                    self.active_connections[room_name] = {}
-                
-                self.active_connections[room_name][client_id] = websocket
-                self.client_rooms[client_id] = room_name
+            # Plain dict updates with no await in between are atomic on the event loop
+            if room_name not in self.active_connections:
+                self.active_connections[room_name] = {}
             
-            self.log_operation("websocket_connect", {
-                "client_id": client_id,
-                "room_name": room_name,
-                "total_connections": len(self.active_connections.get(room_name, {}))
-            })
+            self.active_connections[room_name][client_id] = websocket
+            self.client_rooms[client_id] = room_name
+            
+            self.logger.info(
+                "Operation: websocket_connect client=%s room=%s total=%s",
+                client_id, room_name, len(self.active_connections.get(room_name, {}))
+            )
             
             return True
             
@@ -55,23 +53,22 @@ class WebSocketService(BaseService[None]):
     async def disconnect(self, client_id: str) -> bool:
         """Disconnect a client."""
         try:
-            async with self._lock:
-                room_name = self.client_rooms.get(client_id)
-                if room_name and room_name in self.active_connections:
-                    if client_id in self.active_connections[room_name]:
-                        del self.active_connections[room_name][client_id]
-                    
-                    # Remove empty rooms
-                    if not self.active_connections[room_name]:
-                        del self.active_connections[room_name]
+            room_name = self.client_rooms.get(client_id)
+            if room_name and room_name in self.active_connections:
+                if client_id in self.active_connections[room_name]:
+                    del self.active_connections[room_name][client_id]
                 
-                if client_id in self.client_rooms:
-                    del self.client_rooms[client_id]
+                # Remove empty rooms
+                if not self.active_connections[room_name]:
+                    del self.active_connections[room_name]
             
-            self.log_operation("websocket_disconnect", {
-                "client_id": client_id,
-                "room_name": room_name
-            })
+            if client_id in self.client_rooms:
+                del self.client_rooms[client_id]
+            
+            self.logger.info(
+                "Operation: websocket_disconnect client=%s room=%s",
+                client_id, room_name
+            )
             
             return True
             
@@ -82,7 +79,7 @@ class WebSocketService(BaseService[None]):
     async def send_personal_message(self, message: Any, websocket: WebSocket) -> bool:
         """Send a message to a specific client."""
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_text(orjson.dumps(message).decode())
             return True
             
         except Exception as e:
@@ -95,29 +92,37 @@ class WebSocketService(BaseService[None]):
             if room_name not in self.active_connections:
                 return 0
             
-            message_text = json.dumps(message)
-            sent_count = 0
+            # One ASGI text frame shared by every recipient; clients JSON.parse text frames,
+            # so binary send_bytes frames are not an option here
+            frame = {"type": "websocket.send", "text": orjson.dumps(message).decode()}
+            recipients = [
+                (client_id, connection)
+                for client_id, connection in self.active_connections[room_name].items()
+                if not (exclude_client and client_id == exclude_client)
+            ]
             
-            for client_id, connection in self.active_connections[room_name].items():
-                if exclude_client and client_id == exclude_client:
-                    continue
-                
-                try:
-                    await connection.send_text(message_text)
-                    sent_count += 1
-                except Exception as e:
-                    self.log_error("broadcast_message_individual", e, {
+            # Send to every client at once so a slow socket does not delay the rest
+            results = await asyncio.gather(
+                *(connection.send(frame) for _, connection in recipients),
+                return_exceptions=True
+            )
+            
+            sent_count = 0
+            for (client_id, _), result in zip(recipients, results):
+                if isinstance(result, Exception):
+                    self.log_error("broadcast_message_individual", result, {
                         "client_id": client_id,
                         "room_name": room_name
                     })
                     # Remove failed connection
                     await self.disconnect(client_id)
+                else:
+                    sent_count += 1
             
-            self.log_operation("broadcast_message", {
-                "room_name": room_name,
-                "sent_count": sent_count,
-                "exclude_client": exclude_client
-            })
+            self.logger.info(
+                "Operation: broadcast_message room=%s sent=%s exclude=%s",
+                room_name, sent_count, exclude_client
+            )
             
             return sent_count
             
@@ -137,7 +142,7 @@ class WebSocketService(BaseService[None]):
             return await self.broadcast_message(room_name, system_message)
             
         except Exception as e:
-            self.log_error("send_system_message", e, {"room_name": room_name, "message": message})
+            self.log_error("send_system_message", e, {"room_name": room_name, "system_message": message})
             raise WebSocketError(f"Failed to send system message to room {room_name}")
     
     async def notify_user_joined(self, room_name: str, username: str) -> int:
@@ -234,23 +239,22 @@ class WebSocketService(BaseService[None]):
         """Clean up stale connections."""
         try:
             cleaned_count = 0
+            connections = [
+                (room_name, client_id, websocket)
+                for room_name, room_connections in self.active_connections.items()
+                for client_id, websocket in room_connections.items()
+            ]
+            
+            # Ping every connection at once; the sweep takes as long as the slowest ping
+            results = await asyncio.gather(
+                *(self._ping(websocket) for _, _, websocket in connections),
+                return_exceptions=True
+            )
             
-            async with self._lock:
-                for room_name in list(self.active_connections.keys()):
-                    for client_id in list(self.active_connections[room_name].keys()):
-                        try:
-                            # Try to ping the connection
-                            await self.active_connections[room_name][client_id].ping()
-                        except:
-                            # Connection is stale, remove it
-                            del self.active_connections[room_name][client_id]
-                            if client_id in self.client_rooms:
-                                del self.client_rooms[client_id]
-                            cleaned_count += 1
-                    
-                    # Remove empty rooms
-                    if not self.active_connections[room_name]:
-                        del self.active_connections[room_name]
+            for (room_name, client_id, websocket), result in zip(connections, results):
+                # Connection is stale; skip it if the client reconnected during the ping
+                if isinstance(result, BaseException) and self._remove_connection(room_name, client_id, websocket):
+                    cleaned_count += 1
             
             if cleaned_count > 0:
                 self.log_operation("cleanup_stale_connections", {"cleaned_count": cleaned_count})
@@ -260,3 +264,23 @@ class WebSocketService(BaseService[None]):
         except Exception as e:
             self.log_error("cleanup_stale_connections", e)
             return 0
+    
+    @staticmethod
+    async def _ping(websocket: WebSocket) -> None:
+        """Ping a connection; any failure surfaces through the awaiting gather."""
+        await websocket.ping()
+    
+    def _remove_connection(self, room_name: str, client_id: str, websocket: WebSocket) -> bool:
+        """Remove a client's connection if it is still the given websocket."""
+        room_connections = self.active_connections.get(room_name)
+        if not room_connections or room_connections.get(client_id) is not websocket:
+            return False
+        
+        del room_connections[client_id]
+        if self.client_rooms.get(client_id) == room_name:
+            del self.client_rooms[client_id]
+        
+        # Remove empty rooms
+        if not room_connections:
+            del self.active_connections[room_name]
+        return True
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Run the FasiAPI smoke tests in parallel worker processes.
+"""
+import asyncio
+import importlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# (module, coroutine) for each smoke test; each imports the app independently
+SMOKE_TESTS = [
+    ("test_app", "test_app_startup"),
+    ("test_architecture", "test_architecture"),
+]
+
+
+def run_smoke_test(module_name, test_name):
+    """Import a smoke test module and run its coroutine in this worker process."""
+    test = getattr(importlib.import_module(module_name), test_name)
+    return asyncio.run(test())
+
+
+def main():
+    """Run all smoke tests concurrently and report the combined result."""
+    with ProcessPoolExecutor(max_workers=len(SMOKE_TESTS)) as executor:
+        futures = {
+            f"{module_name}.{test_name}": executor.submit(run_smoke_test, module_name, test_name)
+            for module_name, test_name in SMOKE_TESTS
+        }
+        
+        failed = []
+        for name, future in futures.items():
+            try:
+                if not future.result():
+                    failed.append(name)
+            except Exception as e:
+                print(f"❌ {name} crashed: {e}")
+                failed.append(name)
+    
+    if failed:
+        print(f"\n❌ {len(failed)} of {len(SMOKE_TESTS)} smoke tests failed: {', '.join(failed)}")
+        return False
+    
+    print(f"\n🎉 All {len(SMOKE_TESTS)} smoke tests passed!")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -3,60 +3,195 @@
 Setup script for FasiAPI backend.
 Handles dependency installation and environment setup.
 """
-import subprocess
 import sys
+
+# Reject unsupported interpreters before paying for any other import
+if sys.version_info < (3, 8):
+    print("❌ Python 3.8 or higher is required")
+    print(f"Current version: {sys.version}")
+    sys.exit(1)
+
+import argparse
+import asyncio
+import hashlib
+import shlex
 import os
+from collections import deque
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 
+# Requirements are built into wheels in groups by parallel pip workers
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_GROUP_SIZE = 4
+WHEEL_CACHE_DIR = Path.home() / ".cache" / "fasi_api" / "wheels"
 
-def run_command(command, description):
-    """Run a command and handle errors."""
-    print(f"🔄 {description}...")
-    try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"✅ {description} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {description} failed:")
-        print(f"Error: {e.stderr}")
-        return False
+# Lines of command output shown again when a command fails
+OUTPUT_TAIL_LINES = 200
 
+# pip at or above this version is not upgraded again
+MIN_PIP_VERSION = (24, 0)
 
-def check_python_version():
-    """Check if Python version is compatible."""
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required")
-        print(f"Current version: {sys.version}")
+
+async def run_command(command, description):
+    """Run a command, streaming its output, and handle errors."""
+    print(f"🔄 {description}...")
+    process = await asyncio.create_subprocess_shell(
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
+    )
+    
+    # Only the tail is kept, to report with the error if the command fails
+    recent_output = deque(maxlen=OUTPUT_TAIL_LINES)
+    async for line in process.stdout:
+        text = line.decode(errors="replace").rstrip()
+        recent_output.append(text)
+        print(f"   {text}")
+    
+    if await process.wait() != 0:
+        print(f"❌ {description} failed:")
+        print("Error: " + "\n".join(recent_output))
         return False
-    print(f"✅ Python version {sys.version.split()[0]} is compatible")
+    print(f"✅ {description} completed successfully")
     return True
 
 
-def install_dependencies(use_minimal=False):
-    """Install project dependencies."""
+async def install_dependencies(use_minimal, entries):
+    """Install project dependencies; entries holds the names in the working directory."""
     requirements_file = "requirements-minimal.txt" if use_minimal else "requirements.txt"
     
-    if not os.path.exists(requirements_file):
+    if requirements_file not in entries:
         print(f"❌ Requirements file {requirements_file} not found")
         return False
     
     print(f"📦 Installing dependencies from {requirements_file}...")
     
-    # Upgrade pip first
-    if not run_command(f"{sys.executable} -m pip install --upgrade pip", "Upgrading pip"):
+    # Bootstrap pip, and wheel/setuptools to build sdists into cacheable wheels, in one pip run
+    bootstrap_packages = [] if pip_is_current() else ["pip"]
+    bootstrap_packages += [package for package in ("wheel", "setuptools") if not is_installed(package)]
+    if not bootstrap_packages:
+        print("✅ pip, wheel and setuptools are up to date")
+    elif not await run_command(
+        f"{sys.executable} -m pip install --upgrade {' '.join(bootstrap_packages)}",
+        f"Upgrading {', '.join(bootstrap_packages)}"
+    ):
         return False
     
+    # A fully pinned lock file needs no dependency resolution, so it is preferred when available
+    lock_file = str(Path(requirements_file).with_suffix(".lock"))
+    use_lock = await ensure_lock_file(requirements_file, lock_file, entries)
+    source_file = lock_file if use_lock else requirements_file
+    no_deps = "--no-deps " if use_lock else ""
+    
+    # Wheels are cached per requirements file and interpreter; only a changed file hits the network
+    wheelhouse = WHEEL_CACHE_DIR / f"{sys.implementation.cache_tag}-{requirements_hash(source_file)}"
+    complete_marker = wheelhouse / ".complete"
+    failed_groups = []
+    if complete_marker.exists():
+        print(f"✅ Using cached wheels from {wheelhouse}")
+    else:
+        failed_groups = await build_wheelhouse(read_requirements(source_file), wheelhouse, no_deps)
+        if not failed_groups:
+            complete_marker.touch()
+    
+    if failed_groups:
+        print(f"⚠️  {len(failed_groups)} wheel group(s) failed, installing from the package index instead:")
+        for group in failed_groups:
+            print(f"   - {' '.join(group)}")
+        install_command = f"{sys.executable} -m pip install {no_deps}-r {source_file}"
+    else:
+        install_command = (
+            f"{sys.executable} -m pip install --no-index --find-links={shlex.quote(str(wheelhouse))} {no_deps}-r {source_file}"
+        )
+    
     # Install dependencies
-    if not run_command(f"{sys.executable} -m pip install -r {requirements_file}", f"Installing dependencies from {requirements_file}"):
+    if not await run_command(install_command, f"Installing dependencies from {source_file}"):
         return False
     
     return True
 
 
-def create_env_file():
-    """Create .env file if it doesn't exist."""
+def pip_is_current():
+    """Check whether the installed pip meets MIN_PIP_VERSION."""
+    try:
+        installed = version("pip")
+    except PackageNotFoundError:
+        return False
+    
+    parts = []
+    for part in installed.split(".")[:len(MIN_PIP_VERSION)]:
+        if not part.isdigit():
+            return False
+        parts.append(int(part))
+    return tuple(parts) >= MIN_PIP_VERSION
+
+
+def is_installed(package):
+    """Check whether a distribution is installed in this environment."""
+    try:
+        version(package)
+        return True
+    except PackageNotFoundError:
+        return False
+
+
+async def ensure_lock_file(requirements_file, lock_file, entries):
+    """Make sure a pinned lock file newer than the requirements exists; returns whether to use it."""
+    if lock_file in entries and os.stat(lock_file).st_mtime >= os.stat(requirements_file).st_mtime:
+        print(f"✅ Using pinned dependencies from {lock_file}")
+        return True
+    
+    if not is_installed("pip-tools"):
+        print(f"⚠️  pip-tools not installed, resolving dependencies from {requirements_file}")
+        return False
+    
+    return await run_command(
+        f"{sys.executable} -m piptools compile --quiet --output-file {lock_file} {requirements_file}",
+        f"Locking {requirements_file} into {lock_file}"
+    )
+
+
+def read_requirements(requirements_file):
+    """Read requirement specifiers, skipping comments and blank lines."""
+    requirements = []
+    with open(requirements_file) as f:
+        for line in f:
+            requirement = line.split("#", 1)[0].strip()
+            if requirement:
+                requirements.append(requirement)
+    return requirements
+
+
+def requirements_hash(requirements_file):
+    """Hash a requirements file so its cached wheels are reused until it changes."""
+    return hashlib.sha256(Path(requirements_file).read_bytes()).hexdigest()[:16]
+
+
+async def build_wheelhouse(requirements, wheelhouse, pip_options=""):
+    """Build wheels for requirements into a wheelhouse in parallel; returns the groups that failed."""
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    groups = [
+        requirements[i:i + DOWNLOAD_GROUP_SIZE]
+        for i in range(0, len(requirements), DOWNLOAD_GROUP_SIZE)
+    ]
+    workers = asyncio.Semaphore(DOWNLOAD_WORKERS)
+    
+    async def build_group(group):
+        async with workers:
+            return await run_command(
+                f"{sys.executable} -m pip wheel {pip_options}--wheel-dir {shlex.quote(str(wheelhouse))} "
+                + " ".join(shlex.quote(requirement) for requirement in group),
+                f"Building wheels for {', '.join(group)}"
+            )
+    
+    results = await asyncio.gather(*(build_group(group) for group in groups))
+    return [group for group, succeeded in zip(groups, results) if not succeeded]
+
+
+def create_env_file(entries):
+    """Create .env file if it doesn't exist; entries holds the names in the working directory."""
     env_file = Path(".env")
-    if env_file.exists():
+    if env_file.name in entries:
         print("✅ .env file already exists")
         return True
     
@@ -90,8 +225,7 @@ WS_MAX_CONNECTIONS=1000
 """
     
     try:
-        with open(env_file, 'w') as f:
-            f.write(env_content)
+        env_file.write_bytes(env_content.encode("utf-8"))
         print("✅ .env file created successfully")
         print("⚠️  Please update the .env file with your actual configuration values")
         return True
@@ -100,34 +234,56 @@ WS_MAX_CONNECTIONS=1000
         return False
 
 
+async def setup_environment(use_minimal):
+    """Install dependencies while the .env file is written on a worker thread."""
+    # One directory listing answers every existence check in the run
+    with os.scandir(".") as scan:
+        entries = {entry.name for entry in scan}
+    
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        install_dependencies(use_minimal, entries),
+        loop.run_in_executor(None, create_env_file, entries)
+    )
+
+
 def main():
     """Main setup function."""
+    parser = argparse.ArgumentParser(description="Set up the FasiAPI backend.")
+    install_type = parser.add_mutually_exclusive_group()
+    install_type.add_argument("--full", action="store_true", help="full installation without prompting")
+    install_type.add_argument("--minimal", action="store_true", help="minimal installation without prompting")
+    args = parser.parse_args()
+    
     print("🚀 FasiAPI Backend Setup")
     print("=" * 50)
     
-    # Check Python version
-    if not check_python_version():
-        sys.exit(1)
-    
-    # Ask user for installation type
-    print("\n📋 Installation Options:")
-    print("1. Full installation (with monitoring and observability)")
-    print("2. Minimal installation (core features only)")
-    
-    choice = input("\nEnter your choice (1 or 2): ").strip()
-    use_minimal = choice == "2"
+    # Python version was checked before the imports
+    print(f"✅ Python version {sys.version.split()[0]} is compatible")
     
-    if choice not in ["1", "2"]:
-        print("❌ Invalid choice. Please run the script again and choose 1 or 2.")
-        sys.exit(1)
+    if args.full or args.minimal or not sys.stdin.isatty():
+        # Unattended runs default to the full installation
+        use_minimal = args.minimal
+    else:
+        # Ask user for installation type
+        print("\n📋 Installation Options:")
+        print("1. Full installation (with monitoring and observability)")
+        print("2. Minimal installation (core features only)")
+        
+        choice = input("\nEnter your choice (1 or 2): ").strip()
+        use_minimal = choice == "2"
+        
+        if choice not in ["1", "2"]:
+            print("❌ Invalid choice. Please run the script again and choose 1 or 2.")
+            sys.exit(1)
     
-    # Install dependencies
-    if not install_dependencies(use_minimal):
+    # Install dependencies and create the .env file concurrently
+    dependencies_installed, env_file_created = asyncio.run(setup_environment(use_minimal))
+    if not dependencies_installed:
         print("❌ Dependency installation failed")
         sys.exit(1)
     
-    # Create .env file
-    if not create_env_file():
+    if not env_file_created:
         print("❌ Failed to create .env file")
         sys.exit(1)
     
@@ -8,19 +8,27 @@ import os
 # Add the app directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
-from app.core.config import settings
-from app.core.logging import setup_logging
-from app.db.mongodb import get_database
-from app.repositories.chat_repository import ChatRepository
-from app.services.chat_service import ChatService
+
+# Set once logging handlers are installed, so re-running the test does not add them again
+_LOGGING_CONFIGURED = False
 
 
 async def test_architecture():
     """Test the new architecture components"""
+    global _LOGGING_CONFIGURED
+    # Imported here so collecting this module does not initialize the app, Motor and Redis
+    from app.core.config import settings
+    from app.core.logging import setup_logging
+    from app.core.database import get_database
+    from app.repositories.chat_repository import ChatRepository
+    from app.services.chat_service import ChatService
+    
     print("Testing FasiAPI Architecture...")
     
     # Setup logging
-    setup_logging()
+    if not _LOGGING_CONFIGURED:
+        setup_logging()
+        _LOGGING_CONFIGURED = True
     print("✓ Logging setup complete")
     
     # Test configuration